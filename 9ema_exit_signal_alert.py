@@ -1,21 +1,15 @@
 import os
-import glob
-import requests
-import yfinance as yf
+import sched
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+import numpy as np
 import logging
-import ta
 
-# Set default font to avoid font matching delays
-matplotlib.rcParams['font.family'] = 'DejaVu Sans'
-
-# Delete matplotlib font cache to force rebuild
-cache_dir = os.path.expanduser("~/.cache/matplotlib")
-font_cache_file = os.path.join(cache_dir, "fontlist-v310.json")  # adjust if needed
-
-if os.path.exists(font_cache_file):
-    os.remove(font_cache_file)
-    print(f"Deleted font cache: {font_cache_file}")
+from _njit import scan_breakdown_all, scan_breakdown_ema9
+from ema_common import (BATCH_SIZE, CACHE_TTL_SECONDS, clear_cache, load_cached_data,
+                        save_cache_data, yf_session,
+                        send_telegram_message as _send_telegram)
 
 # Configure detailed logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,11 +18,6 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %
 TELEGRAM_BOT_TOKEN = "7634011883:AAFuBJmueacbc76qjR5o01lEpVnxtE-ALEg"
 TELEGRAM_CHAT_ID = "5046398778"
 
-# Cache directory
-CACHE_DIR = 'cache'
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
-
 # Dictionary of stock tickers to names
 nifty50_tickers = {
     "APLAPOLLO.NS": "Apollo Hospitals",
@@ -47,142 +36,252 @@ nifty50_tickers = {
 }
 
 
-def clear_cache():
-    cache_files = glob.glob(os.path.join(CACHE_DIR, '*.csv'))
-    for file_path in cache_files:
-        try:
-            os.remove(file_path)
-            logging.info(f"Deleted cache file: {file_path}")
-        except Exception as e:
-            logging.warning(f"Failed to delete {file_path}: {e}")
+def send_telegram_message(message):
+    return _send_telegram(message, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
 
 
-def send_telegram_message(message):
-    url = f'https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage'
-    payload = {'chat_id': TELEGRAM_CHAT_ID, 'text': message}
-    try:
-        response = requests.post(url, data=payload)
-        response.raise_for_status()
-        logging.info("Telegram message sent successfully.")
+# Alerts collected during the scan and flushed as one batched message
+alert_buffer = []
+
+TELEGRAM_MAX_LEN = 4096
+
+
+def flush_alerts():
+    """Send all buffered alerts in as few messages as possible.
+
+    Alerts are joined with blank lines and chunked so no single message
+    exceeds Telegram's 4096-character limit.
+    """
+    if not alert_buffer:
         return True
-    except Exception as e:
-        logging.error(f"Error sending Telegram message: {e}")
-        return False
+    ok = True
+    chunk = ''
+    for message in alert_buffer:
+        if chunk and len(chunk) + len(message) + 2 > TELEGRAM_MAX_LEN:
+            ok = send_telegram_message(chunk) and ok
+            chunk = message
+        else:
+            chunk = message if not chunk else f"{chunk}\n\n{message}"
+    if chunk:
+        ok = send_telegram_message(chunk) and ok
+    alert_buffer.clear()
+    return ok
+
+
+# Memoised yf.Ticker handles so repeated lookups reuse one object per symbol
+_ticker_cache = {}
+
+# Per-stock summary records memoised by (ticker, trading day)
+_daily_results = {}
+
+
+def get_ticker(symbol):
+    import yfinance as yf
 
+    ticker = _ticker_cache.get(symbol)
+    if ticker is None:
+        ticker = yf.Ticker(symbol)
+        _ticker_cache[symbol] = ticker
+    return ticker
 
-def load_cached_data(symbol):
-    filepath = os.path.join(CACHE_DIR, f"{symbol}.csv")
-    if os.path.exists(filepath):
+
+def validate_symbols(symbols):
+    """Drop symbols without a quotable last price (delisted/renamed tickers).
+
+    Runs once at startup using fast_info, which is much cheaper than .info,
+    so bad symbols no longer cost a failed download plus exception on every
+    scan.
+    """
+    valid = []
+    for symbol in symbols:
         try:
-            df = pd.read_csv(filepath, index_col=0, parse_dates=True)
-            # Verify and fix index if necessary
-            if not pd.api.types.is_datetime64_any_dtype(df.index):
-                # Get index as strings to filter valid dates
-                index_strs = df.index.astype(str)
-                valid_dates = []
-                for val in index_strs:
-                    try:
-                        # Try parsing each index value
-                        pd.to_datetime(val)
-                        valid_dates.append(val)
-                    except:
-                        # skip invalid entries
-                        pass
-                # Keep only valid date entries
-                df = df.loc[[idx in valid_dates for idx in index_strs]].copy()
-                # Convert index to datetime
-                df.index = pd.to_datetime(df.index)
-            return df
+            has_price = get_ticker(symbol).fast_info.get('lastPrice') is not None
         except Exception as e:
-            logging.warning(f"Failed to load cache for {symbol}: {e}")
-    else:
-        logging.debug(f"No cache found for {symbol}")
-    return None
-
-
-def save_cache_data(symbol, df):
-    filepath = os.path.join(CACHE_DIR, f"{symbol}.csv")
-    df.to_csv(filepath)
-    logging.info(f"Saved cache for {symbol} with {len(df)} rows.")
-
-
-def fetch_data_for_symbol(symbol):
-    df_cached = load_cached_data(symbol)
-    if df_cached is not None:
-        logging.info(f"Using cached data for {symbol} with {len(df_cached)} rows.")
-        return df_cached
-    try:
-        df_new = yf.download(symbol, period='10d', interval='1d', auto_adjust=True)
-        if not df_new.empty:
-            logging.info(f"Fetched {len(df_new)} rows for {symbol}")
-            save_cache_data(symbol, df_new)
+            logging.warning(f"Skipping {symbol}: validation failed ({e})")
+            continue
+        if has_price:
+            valid.append(symbol)
         else:
-            logging.warning(f"No data received for {symbol}")
-        return df_new
-    except Exception as e:
-        logging.error(f"Error fetching data for {symbol}: {e}")
-        return pd.DataFrame()
+            logging.warning(f"Skipping {symbol}: no last price available")
+    return valid
+
+
+def fetch_all_symbols(symbols):
+    """Fetch daily data for all symbols at once.
+
+    Cached symbols are served from disk; the rest are downloaded in a single
+    batched yfinance call (one HTTP round-trip instead of one per symbol) and
+    sliced out of the returned MultiIndex-column frame. yfinance is
+    imported here so fully-cached runs never pay its import cost.
+    """
+    import yfinance as yf
+
+    data = {}
+    missing = []
+    for symbol in symbols:
+        df_cached = load_cached_data(symbol, ttl=CACHE_TTL_SECONDS)
+        if df_cached is not None:
+            logging.info(f"Using cached data for {symbol} with {len(df_cached)} rows.")
+            data[symbol] = df_cached
+        else:
+            missing.append(symbol)
 
+    # Yahoo accepts roughly 20 symbols per request, so larger miss lists
+    # are split into rate-limit-friendly chunks of one request each
+    for start in range(0, len(missing), BATCH_SIZE):
+        chunk = missing[start:start + BATCH_SIZE]
+        try:
+            batch = yf.download(chunk, period='10d', interval='1d',
+                                group_by='ticker', threads=True, auto_adjust=True,
+                                session=yf_session)
+        except Exception as e:
+            logging.error(f"Error fetching batched data for {chunk}: {e}")
+            batch = pd.DataFrame()
+
+        for symbol in chunk:
+            df_new = pd.DataFrame()
+            if not batch.empty:
+                try:
+                    # Single-symbol downloads come back with flat columns
+                    df_new = batch[symbol] if len(chunk) > 1 else batch
+                    df_new = df_new.dropna(how='all')
+                except KeyError:
+                    logging.warning(f"Symbol {symbol} missing from batched response")
+            if not df_new.empty:
+                logging.info(f"Fetched {len(df_new)} rows for {symbol}")
+                save_cache_data(symbol, df_new)
+            else:
+                logging.warning(f"No data received for {symbol}")
+            data[symbol] = df_new
 
-def check_breakdown(df):
-    """Check for EMA9 crossover indicating breakdown using ta library."""
-    if len(df) < 10:
-        logging.debug(f"Not enough data ({len(df)}) to check for breakdown.")
-        return False, None
+    return data
+
+
+def _clean_price_frame(df):
+    """Coerce Close/Low to numeric, drop bad rows and normalise the index.
 
+    Returns the cleaned frame, or None when the input cannot be used.
+    """
     if not isinstance(df, pd.DataFrame):
         logging.warning("Provided data is not a DataFrame.")
-        return False, None
+        return None
 
     expected_cols = {'Close', 'Low'}
     if not expected_cols.issubset(df.columns):
         logging.warning(f"DataFrame missing expected columns. Found columns: {df.columns}")
-        return False, None
-
-    try:
-        close_series = pd.to_numeric(df['Close'], errors='coerce')
-        low_series = pd.to_numeric(df['Low'], errors='coerce')
-    except Exception as e:
-        logging.warning(f"Failed to convert price columns to numeric: {e}")
-        return False, None
-
-    # Drop NaN values
-    df_clean = df.loc[close_series.notna() & low_series.notna()].copy()
-    df_clean['Close'] = close_series.loc[df_clean.index]
-    df_clean['Low'] = low_series.loc[df_clean.index]
+        return None
+
+    # Parquet-cached frames already carry float64 columns, so the numeric
+    # coercion (and the column reallocation it implies) only runs when a
+    # frame actually needs it; either way the caller's frame is not mutated
+    if (np.issubdtype(df['Close'].dtype, np.floating)
+            and np.issubdtype(df['Low'].dtype, np.floating)):
+        df_clean = df.dropna(subset=['Close', 'Low'])
+    else:
+        try:
+            df_clean = df.assign(
+                Close=pd.to_numeric(df['Close'], errors='coerce'),
+                Low=pd.to_numeric(df['Low'], errors='coerce')
+            ).dropna(subset=['Close', 'Low'])
+        except Exception as e:
+            logging.warning(f"Failed to convert price columns to numeric: {e}")
+            return None
 
     # Ensure the index is datetime
     if not pd.api.types.is_datetime64_any_dtype(df_clean.index):
         df_clean.index = pd.to_datetime(df_clean.index)
+    return df_clean
+
+
+def scan_all_frames(data):
+    """Run the breakdown scan for every symbol in one batched kernel call.
+
+    Cleaned Close/Low columns are padded with NaN to a common length and
+    stacked into 2D matrices, so a single kernel pass (parallel across
+    symbols under numba) replaces the frame-by-frame scan. Returns a dict
+    of symbol -> (breakdown, candle_info) in check_breakdown's format.
+    """
+    cleaned = {}
+    for symbol, df in data.items():
+        if df is None or df.empty or len(df) < 10:
+            continue
+        df_clean = _clean_price_frame(df)
+        if df_clean is not None and len(df_clean) >= 2:
+            cleaned[symbol] = df_clean
+
+    results = {}
+    if not cleaned:
+        return results
+
+    symbols = list(cleaned)
+    width = max(len(df_clean) for df_clean in cleaned.values())
+    closes = np.full((len(symbols), width), np.nan)
+    lows = np.full((len(symbols), width), np.nan)
+    for i, symbol in enumerate(symbols):
+        df_clean = cleaned[symbol]
+        closes[i, :len(df_clean)] = df_clean['Close'].to_numpy(dtype=np.float64)
+        lows[i, :len(df_clean)] = df_clean['Low'].to_numpy(dtype=np.float64)
+
+    idxs, breakdown_lows = scan_breakdown_all(closes, lows, 2.0 / 10.0)
+    for i, symbol in enumerate(symbols):
+        idx = int(idxs[i])
+        if idx < 0:
+            results[symbol] = (False, None)
+            continue
+        date = cleaned[symbol].index[idx]
+        logging.info(f"Breakdown detected for {symbol} on {date.date()}")
+        results[symbol] = (True, {'Low': breakdown_lows[i], 'date': date})
+    return results
 
-    # Calculate EMA9 using ta library
-    df_clean['EMA9'] = ta.trend.ema_indicator(df_clean['Close'], window=9)
 
-    # Check for crossover
-    for i in range(1, len(df_clean)):
-        prev_close = df_clean['Close'].iloc[i - 1]
-        prev_ema = df_clean['EMA9'].iloc[i - 1]
-        curr_close = df_clean['Close'].iloc[i]
-        curr_ema = df_clean['EMA9'].iloc[i]
-        date = df_clean.index[i]
+def check_breakdown(df):
+    """Check for EMA9 crossover indicating breakdown."""
+    if len(df) < 10:
+        logging.debug(f"Not enough data ({len(df)}) to check for breakdown.")
+        return False, None
+
+    df_clean = _clean_price_frame(df)
+    if df_clean is None:
+        return False, None
+
+    # Fused EMA9 + crossover scan in one kernel pass; only scalar EMA state
+    # is kept, so no intermediate EMA column is materialised
+    close = df_clean['Close'].to_numpy(dtype=np.float64)
+    low = df_clean['Low'].to_numpy(dtype=np.float64)
+    idx, breakdown_low = scan_breakdown_ema9(close, low)
+    if idx < 0:
+        return False, None
+    date = df_clean.index[idx]
+    logging.info(f"Breakdown detected on {date.date()}: "
+                 f"prev_close={close[idx - 1]}, curr_close={close[idx]}")
+    return True, {
+        'Low': breakdown_low,
+        'date': date
+    }
 
-        # Detect crossover from above/equal to below
-        if prev_close > prev_ema and curr_close < curr_ema:
-            logging.info(f"Breakdown detected on {date.date()}: "
-                         f"prev_close={prev_close}, prev_ema={prev_ema}, "
-                         f"curr_close={curr_close}, curr_ema={curr_ema}")
-            return True, {
-                'Low': df_clean['Low'].iloc[i],
-                'date': date
-            }
 
-    return False, None
 
 
+def process_stock(ticker, name, df, scan_result=None):
+    """Process each stock, reusing today's result when already computed.
+
+    Results are memoised per (ticker, day) so repeated runs within the same
+    trading day return the cached record instead of re-scanning the frame
+    and re-queueing the alert. When the batched kernel already scanned the
+    frame, its (breakdown, candle_info) result is passed in via scan_result.
+    """
+    key = (ticker, time.strftime('%Y-%m-%d'))
+    cached = _daily_results.get(key)
+    if cached is not None:
+        logging.debug(f"Reusing today's result for {name} ({ticker})")
+        return dict(cached)
+    record = _analyse_stock(ticker, name, df, scan_result)
+    _daily_results[key] = dict(record)
+    return record
 
 
-def process_stock(ticker, name):
-    """Process each stock and update the summary info."""
+def _analyse_stock(ticker, name, df, scan_result=None):
+    """Run the breakdown analysis for one stock and build its summary row."""
     record = {
         'Stock': name,
         'Ticker': ticker,
@@ -194,7 +293,6 @@ def process_stock(ticker, name):
         'Date': None
     }
 
-    df = fetch_data_for_symbol(ticker)
     if df is None or df.empty:
         logging.warning(f"No data to process for {name} ({ticker})")
         return record
@@ -212,8 +310,11 @@ def process_stock(ticker, name):
         logging.info(f"Not enough data ({len(df)}) for {name} ({ticker}) to perform analysis.")
         return record
 
-    # Check for breakdown
-    breakdown, candle_info = check_breakdown(df)
+    # Check for breakdown (precomputed by the batched scan when available)
+    if scan_result is not None:
+        breakdown, candle_info = scan_result
+    else:
+        breakdown, candle_info = check_breakdown(df)
     if breakdown:
         low_value = float(candle_info['Low'])  # ensure scalar float
         date_of_candle = candle_info['date'].strftime('%Y-%m-%d')
@@ -227,18 +328,10 @@ def process_stock(ticker, name):
         latest_date = df.index[-1]
         latest_date_str = latest_date.strftime('%Y-%m-%d') if isinstance(latest_date, pd.Timestamp) else 'Unknown'
 
-        logging.info(f"Latest close for {name} ({ticker}): {latest_close}")# Fetch historical data for the last 5 days (to handle weekends/holidays)
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period="5d")
-
-        # Drop any rows without closing price
-        hist = hist.dropna(subset=["Close"])
-
-        # Get the most recent closing price
-        latest_close = hist["Close"][-1]
-        latest_date = hist.index[-1].date()
-
-        print(f"Latest trading day: {latest_date}")
+        # The last row of the fetched frame already holds the latest close;
+        # no second download is needed
+        logging.info(f"Latest close for {name} ({ticker}): {latest_close}")
+        print(f"Latest trading day: {latest_date_str}")
         print(f"{ticker} closing price: {latest_close:.2f}")
 
         # Compare latest close with breakdown low
@@ -248,18 +341,13 @@ def process_stock(ticker, name):
                 f"Breakdown Candle Date: {date_of_candle}\n"
                 f"Breakdown Candle Low: {low_value}\n"
                 f"Latest Close: {latest_close}\n"
-                f"Date: {latest_date}"
+                f"Date: {latest_date_str}"
             )
             logging.info(message)
-            sent = send_telegram_message(message)
-            if sent:
-                logging.info(f"Telegram alert sent for {name} ({ticker})")
-                record['Exit Triggered'] = 'Yes'
-                record['Alert Sent'] = 'Yes'
-            else:
-                logging.warning(f"Failed to send Telegram alert for {name} ({ticker})")
-                record['Exit Triggered'] = 'Yes'
-                record['Alert Sent'] = 'No'
+            # Queue the alert; all alerts are sent as one batched message
+            alert_buffer.append(message)
+            record['Exit Triggered'] = 'Yes'
+            record['Alert Sent'] = 'Queued'
 
             # Update record with details
             record.update({
@@ -276,16 +364,31 @@ def process_stock(ticker, name):
     return record
 
 
-if __name__ == "__main__":
-    # Optional: clear cache before starting
-    # clear_cache()
-
+def run_analysis():
     logging.info("Starting stock analysis with detailed logs...")
-    summary_list = []
 
-    for ticker, name in nifty50_tickers.items():
-        rec = process_stock(ticker, name)
-        summary_list.append(rec)
+    symbols = validate_symbols(list(nifty50_tickers))
+    all_data = fetch_all_symbols(symbols)
+    scan_results = scan_all_frames(all_data)
+    # Per-ticker processing is independent, so a small pool overlaps any
+    # remaining I/O; pool.map keeps the summary in symbol order
+    with ThreadPoolExecutor(max_workers=min(16, max(1, len(symbols)))) as pool:
+        summary_list = list(pool.map(
+            lambda ticker: process_stock(ticker, nifty50_tickers[ticker],
+                                         all_data.get(ticker),
+                                         scan_results.get(ticker, (False, None))),
+            symbols
+        ))
+
+    # Send every queued alert as a single batched message
+    if flush_alerts():
+        for rec in summary_list:
+            if rec['Alert Sent'] == 'Queued':
+                rec['Alert Sent'] = 'Yes'
+    else:
+        for rec in summary_list:
+            if rec['Alert Sent'] == 'Queued':
+                rec['Alert Sent'] = 'No'
 
     # Create DataFrame from summary
     summary_df = pd.DataFrame(summary_list)
@@ -295,3 +398,26 @@ if __name__ == "__main__":
     print(summary_df)
 
     logging.info("Analysis complete.")
+
+
+if __name__ == "__main__":
+    # Optional: clear cache before starting
+    # clear_cache()
+
+    # MONITOR_INTERVAL (seconds) > 0 re-runs the scan on a single shared
+    # clock aligned to the interval boundary, so one wake-up drives one
+    # batched download; the default 0 keeps the single-shot behaviour.
+    interval = int(os.getenv("MONITOR_INTERVAL", "0"))
+    if interval <= 0:
+        run_analysis()
+    else:
+        scheduler = sched.scheduler(time.time, time.sleep)
+
+        def _tick():
+            run_analysis()
+            now = time.time()
+            scheduler.enterabs(now + interval - now % interval, 1, _tick)
+
+        now = time.time()
+        scheduler.enterabs(now + interval - now % interval, 1, _tick)
+        scheduler.run()
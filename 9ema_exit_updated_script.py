@@ -1,38 +1,32 @@
 import os
-import glob
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
 import yfinance as yf
 import pandas as pd
+import numpy as np
 import logging
-import matplotlib.pyplot as plt
-import matplotlib
-import matplotlib.font_manager as fm
-import ta
+from numpy.lib.stride_tricks import sliding_window_view
 
-# Set default font to avoid font matching delays
-matplotlib.rcParams['font.family'] = 'DejaVu Sans'
-
-# Delete matplotlib font cache to force rebuild
-cache_dir = os.path.expanduser("~/.cache/matplotlib")
-font_cache_file = os.path.join(cache_dir, "fontlist-v310.json")  # adjust if needed
-
-if os.path.exists(font_cache_file):
-    os.remove(font_cache_file)
-    print(f"Deleted font cache: {font_cache_file}")
+from ema_common import (BATCH_SIZE, CACHE_DIR, CACHE_TTL_SECONDS, TELEGRAM_BOT_TOKEN,
+                        TELEGRAM_CHAT_ID, clear_cache, load_cached_data,
+                        save_cache_data, send_telegram_message,
+                        fetch_data_for_symbol, yf_session)
 
 # Configure detailed logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Environment variables
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 print(TELEGRAM_BOT_TOKEN)
 print(TELEGRAM_CHAT_ID)
 
-# Cache directory
-CACHE_DIR = 'cache'
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
+# On a fixed 10-bar window the EMA9 recurrence unrolls into a dot product
+# with geometric weights, so the whole EMA series over a frame is a single
+# matrix-vector product on a strided view instead of a pandas ewm call.
+EMA_ALPHA = 2.0 / 10.0
+EMA_WINDOW = 10
+_EMA_WEIGHTS = np.array(
+    [(1.0 - EMA_ALPHA) ** (EMA_WINDOW - 1 - i) * (EMA_ALPHA if i > 0 else 1.0)
+     for i in range(EMA_WINDOW)]
+)
 
 # Dictionary of stock tickers to names
 nifty50_tickers = {
@@ -55,86 +49,55 @@ nifty50_tickers = {
 }
 
 
-def clear_cache():
-    cache_files = glob.glob(os.path.join(CACHE_DIR, '*.csv'))
-    for file_path in cache_files:
-        try:
-            os.remove(file_path)
-            logging.info(f"Deleted cache file: {file_path}")
-        except Exception as e:
-            logging.warning(f"Failed to delete {file_path}: {e}")
-
-
-def send_telegram_message(message):
-    url = f'https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage'
-    payload = {'chat_id': TELEGRAM_CHAT_ID, 'text': message}
-    try:
-        response = requests.post(url, data=payload)
-        response.raise_for_status()
-        logging.info("Telegram message sent successfully.")
-        return True
-    except Exception as e:
-        logging.error(f"Error sending Telegram message: {e}")
-        return False
+def fetch_all_symbols(symbols):
+    """Resolve frames for every symbol, batching downloads for cache misses.
 
+    Symbols with a cache entry go through fetch_data_for_symbol, which also
+    handles the TTL check and incremental tail update; the full downloads
+    for cache misses are collapsed into one batched yfinance call.
+    """
+    data = {}
+    missing = []
+    for symbol in symbols:
+        if load_cached_data(symbol) is not None:
+            data[symbol] = fetch_data_for_symbol(symbol)
+        else:
+            missing.append(symbol)
 
-def load_cached_data(symbol):
-    filepath = os.path.join(CACHE_DIR, f"{symbol}.csv")
-    if os.path.exists(filepath):
+    # Yahoo accepts roughly 20 symbols per request, so larger miss lists
+    # are split into rate-limit-friendly chunks of one request each
+    for start in range(0, len(missing), BATCH_SIZE):
+        chunk = missing[start:start + BATCH_SIZE]
         try:
-            df = pd.read_csv(filepath, index_col=0, parse_dates=True)
-            # Verify and fix index if necessary
-            if not pd.api.types.is_datetime64_any_dtype(df.index):
-                # Get index as strings to filter valid dates
-                index_strs = df.index.astype(str)
-                valid_dates = []
-                for val in index_strs:
-                    try:
-                        # Try parsing each index value
-                        pd.to_datetime(val)
-                        valid_dates.append(val)
-                    except:
-                        # skip invalid entries
-                        pass
-                # Keep only valid date entries
-                df = df.loc[[idx in valid_dates for idx in index_strs]].copy()
-                # Convert index to datetime
-                df.index = pd.to_datetime(df.index)
-            return df
+            batch = yf.download(chunk, period='10d', interval='1d',
+                                group_by='ticker', threads=True, auto_adjust=True,
+                                session=yf_session)
         except Exception as e:
-            logging.warning(f"Failed to load cache for {symbol}: {e}")
-    else:
-        logging.debug(f"No cache found for {symbol}")
-    return None
-
-
-def save_cache_data(symbol, df):
-    filepath = os.path.join(CACHE_DIR, f"{symbol}.csv")
-    df.to_csv(filepath)
-    logging.info(f"Saved cache for {symbol} with {len(df)} rows.")
-
+            logging.error(f"Error fetching batched data for {chunk}: {e}")
+            batch = pd.DataFrame()
+
+        for symbol in chunk:
+            df_new = pd.DataFrame()
+            if not batch.empty:
+                try:
+                    # Single-symbol downloads come back with flat columns
+                    df_new = batch[symbol] if len(chunk) > 1 else batch
+                    df_new = df_new.dropna(how='all')
+                except KeyError:
+                    logging.warning(f"Symbol {symbol} missing from batched response")
+            if not df_new.empty:
+                logging.info(f"Fetched {len(df_new)} rows for {symbol}")
+                save_cache_data(symbol, df_new)
+            else:
+                logging.warning(f"No data received for {symbol}")
+            data[symbol] = df_new
 
-def fetch_data_for_symbol(symbol):
-    df_cached = load_cached_data(symbol)
-    if df_cached is not None:
-        logging.info(f"Using cached data for {symbol} with {len(df_cached)} rows.")
-        return df_cached
-    try:
-        df_new = yf.download(symbol, period='10d', interval='1d', auto_adjust=True)
-        if not df_new.empty:
-            logging.info(f"Fetched {len(df_new)} rows for {symbol}")
-            save_cache_data(symbol, df_new)
-        else:
-            logging.warning(f"No data received for {symbol}")
-        return df_new
-    except Exception as e:
-        logging.error(f"Error fetching data for {symbol}: {e}")
-        return pd.DataFrame()
+    return data
 
 
 def check_breakdown(df):
-    """Check for EMA9 crossover indicating breakdown using ta library."""
-    if len(df) < 10:
+    """Check for EMA9 crossover indicating breakdown via windowed-EMA weights."""
+    if len(df) < EMA_WINDOW:
         logging.debug(f"Not enough data ({len(df)}) to check for breakdown.")
         return False, None
 
@@ -147,46 +110,52 @@ def check_breakdown(df):
         logging.warning(f"DataFrame missing expected columns. Found columns: {df.columns}")
         return False, None
 
+    # Coerce the price columns and drop bad rows in one assign/dropna pass,
+    # avoiding the extra index-aligned .loc writes of the old cleanup
     try:
-        close_series = pd.to_numeric(df['Close'], errors='coerce')
-        low_series = pd.to_numeric(df['Low'], errors='coerce')
+        df_clean = df.assign(
+            Close=pd.to_numeric(df['Close'], errors='coerce'),
+            Low=pd.to_numeric(df['Low'], errors='coerce')
+        ).dropna(subset=['Close', 'Low'])
     except Exception as e:
         logging.warning(f"Failed to convert price columns to numeric: {e}")
         return False, None
 
-    # Drop NaN values
-    df_clean = df.loc[close_series.notna() & low_series.notna()].copy()
-    df_clean['Close'] = close_series.loc[df_clean.index]
-    df_clean['Low'] = low_series.loc[df_clean.index]
+    # Dropping bad rows may have shrunk the frame below the window, and
+    # sliding_window_view raises on a too-short array
+    if len(df_clean) < EMA_WINDOW:
+        logging.debug(f"Not enough clean data ({len(df_clean)}) to check for breakdown.")
+        return False, None
 
     # Ensure the index is datetime
     if not pd.api.types.is_datetime64_any_dtype(df_clean.index):
         df_clean.index = pd.to_datetime(df_clean.index)
 
-    # Calculate EMA9 using ta library
-    df_clean['EMA9'] = ta.trend.ema_indicator(df_clean['Close'], window=9)
-
-    # Check for crossover
-    for i in range(1, len(df_clean)):
-        curr_close = df_clean['Close'].iloc[i]
-        curr_ema = df_clean['EMA9'].iloc[i]
-        date = df_clean.index[i]
-
-        print(f"Date: {date.date()} | Close: {curr_close:.2f} | EMA9: {curr_ema:.2f}")
-
-        # Detect crossover from above/equal to below
-        if curr_close < curr_ema:
-            logging.info(f"Breakdown detected on {date.date()}: "
-                         f"curr_close={curr_close}, curr_ema={curr_ema}")
-            return True, {
-                'Low': df_clean['Low'].iloc[i],
-                'date': date
-            }
+    # EMA9 for every bar in one GEMV over the precomputed geometric weights;
+    # the first EMA_WINDOW-1 entries stay NaN, same as the indicator warm-up
+    close = df_clean['Close'].to_numpy(dtype=float)
+    ema = np.full(close.size, np.nan)
+    ema[EMA_WINDOW - 1:] = sliding_window_view(close, EMA_WINDOW) @ _EMA_WEIGHTS
+
+    # Vectorised scan for the latest close below EMA9; only the most recent
+    # breakdown governs the next-candle confirmation, so earlier stale hits
+    # in the window are ignored
+    mask = close[1:] < ema[1:]
+    hits = np.flatnonzero(mask)
+    if hits.size == 0:
+        return False, None
 
-    return False, None
+    idx = int(hits[-1]) + 1
+    date = df_clean.index[idx]
+    logging.info(f"Breakdown detected on {date.date()}: "
+                 f"curr_close={close[idx]}, curr_ema={ema[idx]}")
+    return True, {
+        'Low': df_clean['Low'].iloc[idx],
+        'date': date
+    }
 
 
-def process_stock(ticker, name):
+def process_stock(ticker, name, df):
     """Process each stock and update the summary info with exit condition based on next candle."""
     record = {
         'Stock': name,
@@ -199,7 +168,6 @@ def process_stock(ticker, name):
         'Date': None
     }
 
-    df = fetch_data_for_symbol(ticker)
     if df is None or df.empty:
         logging.warning(f"No data to process for {name} ({ticker})")
         return record
@@ -227,11 +195,17 @@ def process_stock(ticker, name):
         logging.info(f"Breakdown Candle Date: {date_of_candle}")
         logging.info(f"Breakdown Candle Low: {low_of_candle}")
 
-        # Fetch the next day's candle data
-        next_day_start = date_of_candle + pd.Timedelta(days=1)
-        next_day_end = next_day_start + pd.Timedelta(days=2)  # buffer for weekends/holidays
-
-        next_candle_df = yf.download(ticker, start=next_day_start, end=next_day_end, interval='1d')
+        # The fetched frame already holds the bars after the breakdown
+        # candle, so the next candle is an in-frame slice rather than a
+        # second download round-trip per triggered symbol
+        next_candle_df = df.loc[df.index > date_of_candle]
+        if next_candle_df.empty:
+            # Rare: the breakdown candle is the last cached bar, so only
+            # then fall back to a network fetch for the confirmation candle
+            next_day_start = date_of_candle + pd.Timedelta(days=1)
+            next_day_end = next_day_start + pd.Timedelta(days=2)  # buffer for weekends/holidays
+            next_candle_df = yf.download(ticker, start=next_day_start, end=next_day_end,
+                                         interval='1d', session=yf_session)
 
         if not next_candle_df.empty:
             next_candle = next_candle_df.iloc[0]
@@ -268,15 +242,12 @@ def process_stock(ticker, name):
                             f"Next Candle Close: {close_price}\n"
                             f"Next Candle is Bearish and closes below breakdown low."
                         )
-                        sent = send_telegram_message(message)
-                        if sent:
-                            logging.info(f"Exit confirmation sent for {name} ({ticker})")
-                            record['Exit Triggered'] = 'Yes'
-                            record['Alert Sent'] = 'Yes'
-                        else:
-                            logging.warning(f"Failed to send exit confirmation for {name} ({ticker})")
-                            record['Exit Triggered'] = 'Yes'
-                            record['Alert Sent'] = 'No'
+                        # Queue the alert; all confirmations go out in
+                        # one batched Telegram message after the scan
+                        logging.info(f"Exit confirmation queued for {name} ({ticker})")
+                        record['Exit Triggered'] = 'Yes'
+                        record['Alert Sent'] = 'Queued'
+                        record['Message'] = message
                 else:
                     logging.info("Next candle is not bearish; no exit triggered.")
             else:
@@ -292,19 +263,86 @@ def process_stock(ticker, name):
 
 
 
+def _setup_matplotlib():
+    """Configure matplotlib for headless use, importing it only on demand.
+
+    Nothing on the scan path plots, so the ~500ms matplotlib import and
+    font setup are deferred until a caller actually needs a figure.
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # headless backend; skips GUI backend init
+    # Set default font to avoid font matching delays
+    matplotlib.rcParams['font.family'] = 'DejaVu Sans'
+    # Rebuilding the font cache forces a multi-second filesystem scan on
+    # the next matplotlib use, so it only happens when explicitly requested
+    if os.environ.get('REBUILD_MPL_CACHE'):
+        font_cache_file = os.path.join(os.path.expanduser("~/.cache/matplotlib"),
+                                       "fontlist-v310.json")  # adjust if needed
+        if os.path.exists(font_cache_file):
+            os.remove(font_cache_file)
+            print(f"Deleted font cache: {font_cache_file}")
+    return matplotlib
+
+
 if __name__ == "__main__":
     # Optional: clear cache before starting
     # clear_cache()
 
     logging.info("Starting stock analysis with detailed logs...")
-    summary_list = []
 
-    for ticker, name in nifty50_tickers.items():
-        rec = process_stock(ticker, name)
-        summary_list.append(rec)
+    # One batched download resolves all cache misses up front; the thread
+    # pool then overlaps the per-symbol confirmation fetches. Every thread
+    # writes its own cache file, so no locking is needed
+    all_data = fetch_all_symbols(list(nifty50_tickers))
+
+    # Preallocate one array per summary column and let each task write its
+    # own slot; the DataFrame is then assembled column-wise in one step with
+    # no per-row dict hashing or dtype inference. Distinct slots make the
+    # threaded writes lock-free.
+    items = list(nifty50_tickers.items())
+    n = len(items)
+    summary_cols = {
+        'Stock': np.empty(n, dtype=object),
+        'Ticker': np.empty(n, dtype=object),
+        'Exit Triggered': np.empty(n, dtype=object),
+        'Alert Sent': np.empty(n, dtype=object),
+        'Breakdown Candle Date': np.empty(n, dtype=object),
+        'Breakdown Candle Low': np.full(n, np.nan),
+        'Current Close Price': np.full(n, np.nan),
+        'Date': np.empty(n, dtype=object),
+    }
+    _float_cols = ('Breakdown Candle Low', 'Current Close Price')
+
+    alert_messages = []
+
+    def run_slot(i, ticker, name):
+        record = process_stock(ticker, name, all_data.get(ticker))
+        message = record.pop('Message', None)
+        if message:
+            alert_messages.append(message)
+        for col, arr in summary_cols.items():
+            value = record[col]
+            if col in _float_cols and value is None:
+                value = np.nan
+            arr[i] = value
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(
+            lambda args: run_slot(*args),
+            ((i, ticker, name) for i, (ticker, name) in enumerate(items))
+        ))
+
+    # One bulk POST covers every queued confirmation instead of a
+    # round-trip per triggered ticker
+    if alert_messages:
+        bulk_sent = send_telegram_message("\n\n".join(alert_messages))
+    else:
+        bulk_sent = True
+    queued = summary_cols['Alert Sent'] == 'Queued'
+    summary_cols['Alert Sent'][queued] = 'Yes' if bulk_sent else 'No'
 
     # Create DataFrame from summary
-    summary_df = pd.DataFrame(summary_list)
+    summary_df = pd.DataFrame(summary_cols)
 
     # Print the summary
     print("\nSummary of Exit Signals:\n")
@@ -36,6 +36,8 @@ from datetime import datetime
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
+from _njit import ewma9, wma30
+
 # List of top 10 Nifty 50 tickers
 nifty50_tickers = [
     "RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS",
@@ -50,11 +52,15 @@ def compute_wma_and_slope(df):
     Returns:
         DataFrame: with added 'WMA', 'WMA_Slope', and 'EMA9' columns.
     """
-    df['WMA'] = df['Close'].rolling(window=30).apply(
-        lambda prices: np.dot(prices, np.arange(1, 31)) / np.arange(1, 31).sum(), raw=True
-    )
-    df['WMA_Slope'] = df['WMA'].diff(1)
-    df['EMA9'] = df['Close'].ewm(span=9, adjust=False).mean()
+    # The rolling apply called a Python lambda (with fresh weight arrays)
+    # once per row; wma30 runs the whole weighted window in one kernel pass
+    close = df['Close'].to_numpy(dtype=np.float64)
+    wma = wma30(close)
+    df['WMA'] = wma
+    df['WMA_Slope'] = np.diff(wma, prepend=np.nan)
+    # EMA9 via the specialised four-wide unrolled recurrence kernel;
+    # skips pandas' general-purpose ewm machinery on these short series
+    df['EMA9'] = ewma9(close)
     return df
 
 def detect_weinstein_signals(ticker, start, end, capital=100000):
@@ -78,32 +84,49 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
                 "Total Profit": 0,
                 "CAGR (%)": 0,
                 "Successful Trades": 0,
-                "Trade Details": [],
-                "Portfolio Timeline": []
+                "Trade Details": pd.DataFrame(),
+                "Portfolio Timeline": pd.Series(dtype=np.float64)
             }
 
         df = compute_wma_and_slope(df)
 
         in_position = False
         entry_price = 0
-        trades = 0
         cash = capital
         shares = 0
-        entry_date = None
-        trade_details = []
+        entry_i = -1
+
+        # SoA trade buffers: preallocated parallel arrays filled by index,
+        # sized to a safe upper bound (a round trip spans at least two bars)
+        max_trades = len(df) // 2 + 1
+        entry_idx = np.empty(max_trades, dtype=np.int64)
+        exit_idx = np.empty(max_trades, dtype=np.int64)
+        entry_prices = np.empty(max_trades, dtype=np.float64)
+        exit_prices = np.empty(max_trades, dtype=np.float64)
+        profits = np.empty(max_trades, dtype=np.float64)
+        n_trades = 0
 
         # For tracking breakdown candles
         breakdown_candle_low = None
 
-        # To record portfolio value over time
-        portfolio_timeline = []
+        # Portfolio value per bar, written straight into a preallocated
+        # array (NaN rows are skipped and dropped when the series is built)
+        timeline_values = np.full(len(df) - 30, np.nan)
+
+        # Pull the columns out as contiguous arrays once; per-row .iloc
+        # lookups re-enter the pandas indexing machinery on every access
+        close_arr = df["Close"].to_numpy(dtype=np.float64)
+        wma_arr = df["WMA"].to_numpy(dtype=np.float64)
+        slope_arr = df["WMA_Slope"].to_numpy(dtype=np.float64)
+        ema9_arr = df["EMA9"].to_numpy(dtype=np.float64)
+        low_arr = df["Low"].to_numpy(dtype=np.float64)
 
         for i in range(30, len(df)):
-            close = float(df["Close"].iloc[i])
-            wma = float(df["WMA"].iloc[i])
-            slope = float(df["WMA_Slope"].iloc[i])
-            ema9 = float(df["EMA9"].iloc[i])
-            low = float(df["Low"].iloc[i])  # Weekly low
+            close = close_arr[i]
+            wma = wma_arr[i]
+            slope = slope_arr[i]
+            ema9 = ema9_arr[i]
+            low = low_arr[i]  # Weekly low
 
             if pd.isna(close) or pd.isna(wma) or pd.isna(slope) or pd.isna(ema9):
                 continue
@@ -115,16 +138,9 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
                 if shares > 0:
                     cash -= shares * entry_price
                     in_position = True
-                    entry_date = df.index[i]
+                    entry_i = i
                     # Reset breakdown candle info
                     breakdown_candle_low = None
-                    current_trade = {
-                        "Entry Date": entry_date,
-                        "Entry Price": entry_price,
-                        "Exit Date": None,
-                        "Exit Price": None,
-                        "Profit": None
-                    }
 
             # Track breakdown candle if price drops below EMA9 during position
             if in_position and close < ema9:
@@ -136,13 +152,14 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
                 if close < breakdown_candle_low:
                     exit_price = close
                     cash += shares * exit_price
-                    trades += 1
                     profit = (exit_price - entry_price) * shares
                     # Log all trades
-                    current_trade["Exit Date"] = df.index[i]
-                    current_trade["Exit Price"] = exit_price
-                    current_trade["Profit"] = profit
-                    trade_details.append(current_trade)
+                    entry_idx[n_trades] = entry_i
+                    exit_idx[n_trades] = i
+                    entry_prices[n_trades] = entry_price
+                    exit_prices[n_trades] = exit_price
+                    profits[n_trades] = profit
+                    n_trades += 1
                     # Reset position and breakdown candle
                     in_position = False
                     shares = 0
@@ -150,32 +167,41 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
 
             # Record portfolio value at each step
             total_value = cash + (shares * close) if in_position else cash
-            portfolio_timeline.append({
-                'Date': df.index[i],
-                'Portfolio Value': total_value
-            })
+            timeline_values[i - 30] = total_value
 
         # Close open position at the end
         if in_position:
-            final_price = float(df["Close"].iloc[-1])
+            final_price = float(close_arr[-1])
             cash += shares * final_price
-            trades += 1
             profit = (final_price - entry_price) * shares
             # Log all trades
-            current_trade["Exit Date"] = df.index[-1]
-            current_trade["Exit Price"] = final_price
-            current_trade["Profit"] = profit
-            trade_details.append(current_trade)
+            entry_idx[n_trades] = entry_i
+            exit_idx[n_trades] = len(df) - 1
+            entry_prices[n_trades] = entry_price
+            exit_prices[n_trades] = final_price
+            profits[n_trades] = profit
+            n_trades += 1
             total_value = cash
 
         total_profit = total_value - capital
-        successful_trades = len([t for t in trade_details if t["Profit"] > 0])
+        # Assemble the trade log once from the SoA buffers
+        trade_details = pd.DataFrame({
+            "Entry Date": df.index[entry_idx[:n_trades]],
+            "Entry Price": entry_prices[:n_trades],
+            "Exit Date": df.index[exit_idx[:n_trades]],
+            "Exit Price": exit_prices[:n_trades],
+            "Profit": profits[:n_trades],
+        })
+        successful_trades = int((profits[:n_trades] > 0).sum())
+        # The timeline is one aligned Series; year-end aggregation later is
+        # a single resample instead of dict building plus groupby
+        portfolio_timeline = pd.Series(timeline_values, index=df.index[30:]).dropna()
         years = (df.index[-1] - df.index[0]).days / 365.25
         cagr = ((total_value / capital) ** (1 / years) - 1) * 100
 
         return {
             "Ticker": ticker,
-            "Trades": trades,
+            "Trades": n_trades,
             "Total Profit": round(total_profit, 2),
             "CAGR (%)": round(cagr, 2),
             "Successful Trades": successful_trades,
@@ -191,8 +217,8 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
             "Total Profit": 0,
             "CAGR (%)": 0,
             "Successful Trades": 0,
-            "Trade Details": [],
-            "Portfolio Timeline": []
+            "Trade Details": pd.DataFrame(),
+            "Portfolio Timeline": pd.Series(dtype=np.float64)
         }
 
 # Run strategy for selected stocks
@@ -216,36 +242,29 @@ print(df_result[['Ticker', 'Trades', 'Total Profit', 'CAGR (%)', 'Successful Tra
 # Save detailed trade logs for the top stock
 top_stock = df_result.iloc[0]['Ticker']
 top_stock_data = next(r for r in results if r['Ticker'] == top_stock)
-trade_details_df = pd.DataFrame(top_stock_data['Trade Details'])
+trade_details_df = top_stock_data['Trade Details']
 trade_details_df.to_csv(f"{top_stock}_all_trade_details.csv", index=False)
 
 # --- Display total portfolio value and CAGR ---
-final_value = top_stock_data['Portfolio Timeline'][-1]['Portfolio Value']
+portfolio_timeline = top_stock_data['Portfolio Timeline']
+final_value = float(portfolio_timeline.iloc[-1])
 cagr_percent = top_stock_data['CAGR (%)']
 
 print(f"\nTotal Portfolio Value at End: ₹{final_value:.2f}")
 print(f"Portfolio CAGR: {cagr_percent:.2f}%")
 
-# Prepare data for yearly growth plot
-portfolio_timeline = top_stock_data['Portfolio Timeline']
-dates = [entry['Date'] for entry in portfolio_timeline]
-values = [entry['Portfolio Value'] for entry in portfolio_timeline]
-
-# Convert dates to pandas datetime for grouping
-df_portfolio = pd.DataFrame({'Date': dates, 'Value': values})
-df_portfolio['Year'] = pd.to_datetime(df_portfolio['Date']).dt.year
-
-# Get the last portfolio value for each year
-year_end_values = df_portfolio.groupby('Year').last()
+# The timeline is already a date-indexed Series, so the last portfolio
+# value per year is one C-level resample
+year_end_values = portfolio_timeline.resample('YE').last()
 
 # Plot yearly growth
 plt.figure(figsize=(12, 6))
-plt.plot(year_end_values.index, year_end_values['Value'], marker='o', linestyle='-')
+plt.plot(year_end_values.index.year, year_end_values.values, marker='o', linestyle='-')
 plt.title(f"Yearly Portfolio Growth for {top_stock}")
 plt.xlabel("Year")
 plt.ylabel("Portfolio Value (₹)")
 plt.grid(True, linestyle='--', alpha=0.7)
-plt.xticks(year_end_values.index)
+plt.xticks(year_end_values.index.year)
 plt.tight_layout()
 plt.show()
 
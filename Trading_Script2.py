@@ -1,8 +1,15 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
 import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+from _njit import ewma9, run_weinstein
+from ema_common import CACHE_TTL_SECONDS, load_cached_data, save_cache_data
+
 # List of top 10 Nifty 50 tickers
 nifty50_tickers = [
     "RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS",
@@ -17,119 +24,92 @@ nifty50_tickers = [
     "VEDL.NS", "COALINDIA.NS"
 ]
 
+# Linear WMA weights, normalized once at import instead of rebuilding
+# the arange inside every rolling window
+_WMA_W = np.arange(1, 31, dtype=np.float64)
+_WMA_W /= _WMA_W.sum()
+
 # Calculate 30-week WMA, slope, and 9-week EMA
 def compute_wma_and_slope(df):
-    df['WMA'] = df['Close'].rolling(window=30).apply(
-        lambda prices: np.dot(prices, np.arange(1, 31)) / np.arange(1, 31).sum(), raw=True
-    )
-    df['WMA_Slope'] = df['WMA'].diff(1)
-    df['EMA9'] = df['Close'].ewm(span=9, adjust=False).mean()
+    # One convolution over the raw close array replaces the per-window
+    # Python lambda of rolling.apply; reversed weights make 'valid'
+    # convolution equal the windowed dot product
+    closes = df['Close'].to_numpy(dtype=np.float64)
+    wma = np.full(len(closes), np.nan)
+    if len(closes) >= 30:
+        wma[29:] = np.convolve(closes, _WMA_W[::-1], mode='valid')
+    df['WMA'] = wma
+    df['WMA_Slope'] = np.diff(wma, prepend=np.nan)
+    # EMA9 (alpha = 2/10) as an allocation-free compiled recurrence over
+    # the already-extracted close array instead of pandas ewm
+    df['EMA9'] = ewma9(closes)
     return df
 
-def detect_weinstein_signals(ticker, start, end, capital=100000):
-    try:
-        df = yf.download(ticker, start=start, end=end, interval='1wk', auto_adjust=True, progress=False)
+# Struct-of-arrays view of one ticker's bars: six contiguous ndarrays
+# with none of the DataFrame block-manager dispatch per access
+_Bars = namedtuple('_Bars', 'close wma slope ema9 low ts')
+
 
+def _compute_arrays(df):
+    return _Bars(df["Close"].to_numpy(dtype=np.float64),
+                 df["WMA"].to_numpy(dtype=np.float64),
+                 df["WMA_Slope"].to_numpy(dtype=np.float64),
+                 df["EMA9"].to_numpy(dtype=np.float64),
+                 df["Low"].to_numpy(dtype=np.float64),
+                 df.index.to_numpy())
+
+
+def detect_weinstein_signals(ticker, df, capital=100000):
+    try:
         if df.empty or len(df) < 40:
             return {
                 "Ticker": ticker,
                 "Trades": 0,
                 "Total Profit": 0,
-                "CAGR (%)": 0,
+                "First": pd.NaT,
+                "Last": pd.NaT,
                 "Successful Trades": 0,
-                "Trade Details": []
+                "Trade Details": pd.DataFrame()
             }
 
         df = compute_wma_and_slope(df)
 
-        in_position = False
-        entry_price = 0
-        trades = 0
-        cash = capital
-        shares = 0
-        entry_date = None
-        trade_details = []
-
-        # For tracking breakdown candles
-        breakdown_candle_low = None
-        breakdown_candle_close_below_wema = False
-
-        for i in range(30, len(df)):
-            close = float(df["Close"].iloc[i])
-            wma = float(df["WMA"].iloc[i])
-            slope = float(df["WMA_Slope"].iloc[i])
-            ema9 = float(df["EMA9"].iloc[i])
-            low = float(df["Low"].iloc[i])  # Weekly low
-
-            if pd.isna(close) or pd.isna(wma) or pd.isna(slope) or pd.isna(ema9):
-                continue
-
-            # BUY CONDITION:
-            # 1. Close > WEMA (EMA9)
-            # 2. Close > WMA
-            # 3. Slope > 0
-            if not in_position and close > ema9 and close > wma and slope > 0:
-                entry_price = close
-                shares = cash // entry_price
-                if shares > 0:
-                    cash -= shares * entry_price
-                    in_position = True
-                    entry_date = df.index[i]
-                    # Reset breakdown candle info
-                    breakdown_candle_low = None
-                    breakdown_candle_close_below_wema = False
-                    current_trade = {
-                        "Entry Date": entry_date,
-                        "Entry Price": entry_price,
-                        "Exit Date": None,
-                        "Exit Price": None,
-                        "Profit": None
-                    }
-
-            # Track breakdown candle if close below 9 WEMA
-            if in_position and close < ema9:
-                if breakdown_candle_low is None:
-                    breakdown_candle_low = low
-
-            # Exit condition:
-            # When a breakdown candle was identified AND next candle closes below that candle's low
-            if in_position and breakdown_candle_low is not None:
-                if close < breakdown_candle_low:
-                    exit_price = close
-                    cash += shares * exit_price
-                    trades += 1
-                    profit = (exit_price - entry_price) * shares
-                    if profit > 0:
-                        current_trade["Exit Date"] = df.index[i]
-                        current_trade["Exit Price"] = exit_price
-                        current_trade["Profit"] = profit
-                        trade_details.append(current_trade)
-                    in_position = False
-                    shares = 0
-                    breakdown_candle_low = None
-
-        # Final sell if still holding position
-        if in_position:
-            final_price = float(df["Close"].iloc[-1])
-            cash += shares * final_price
-            trades += 1
-            profit = (final_price - entry_price) * shares
-            if profit > 0:
-                current_trade["Exit Date"] = df.index[-1]
-                current_trade["Exit Price"] = final_price
-                current_trade["Profit"] = profit
-                trade_details.append(current_trade)
+        # The buy/breakdown/exit state machine runs in the compiled
+        # kernel on the struct-of-arrays view; the loop here used to pay
+        # five boxed .iloc lookups plus four pd.isna calls per bar
+        b = _compute_arrays(df)
+
+        cash, trades, entry_idx, exit_idx, entry_px, exit_px, trade_shares = run_weinstein(
+            b.close, b.wma, b.slope, b.ema9, b.low, float(capital)
+        )
+
+        # Keep only profitable trades in the log, as before; the kernel
+        # already hands back parallel arrays, so the log is one columnar
+        # frame built from boolean slices instead of a dict per trade
+        profits = (exit_px[:trades] - entry_px[:trades]) * trade_shares[:trades]
+        win = profits > 0
+        trade_details = pd.DataFrame({
+            "Entry Date": df.index[entry_idx[:trades][win]],
+            "Entry Price": entry_px[:trades][win],
+            "Exit Date": df.index[exit_idx[:trades][win]],
+            "Exit Price": exit_px[:trades][win],
+            "Profit": profits[win]
+        })
 
         total_profit = cash - capital
-        successful_trades = len(trade_details)
-        years = (df.index[-1] - df.index[0]).days / 365.25
-        cagr = ((cash / capital) ** (1 / years) - 1) * 100
+        # Tallied straight off the profits array rather than re-walking
+        # the trade log; the log only holds profitable trades, so the
+        # two counts agree by construction
+        successful_trades = int(win.sum())
 
+        # CAGR is computed over the whole result frame in one vector
+        # pass after the pool; workers only report the span endpoints
         return {
             "Ticker": ticker,
             "Trades": trades,
             "Total Profit": round(total_profit, 2),
-            "CAGR (%)": round(cagr, 2),
+            "First": b.ts[0],
+            "Last": b.ts[-1],
             "Successful Trades": successful_trades,
             "Trade Details": trade_details
         }
@@ -140,43 +120,87 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
             "Ticker": ticker,
             "Trades": 0,
             "Total Profit": 0,
-            "CAGR (%)": 0,
+            "First": pd.NaT,
+            "Last": pd.NaT,
             "Successful Trades": 0,
-            "Trade Details": []
+            "Trade Details": pd.DataFrame()
         }
 
 # Run the strategy for selected stocks
-start_date = "2010-01-01"
-end_date = datetime.today().strftime("%Y-%m-%d")
-initial_capital = 100000
-
-results = []
-for ticker in nifty50_tickers:
-    print(f"Processing {ticker}...")
-    result = detect_weinstein_signals(ticker, start=start_date, end=end_date, capital=initial_capital)
-    results.append(result)
-
-# Final Results DataFrame
-df_result = pd.DataFrame(results)
-df_result = df_result.sort_values(by="CAGR (%)", ascending=False)
-
-# Display summary
-print(df_result[['Ticker', 'Trades', 'Total Profit', 'CAGR (%)', 'Successful Trades']])
-
-# Save detailed trades for the top stock
-top_stock = df_result.iloc[0]['Ticker']
-top_stock_details = next(r for r in results if r['Ticker'] == top_stock)
-trade_details_df = pd.DataFrame(top_stock_details['Trade Details'])
-trade_details_df.to_csv(f"{top_stock}_profitable_trade_details.csv", index=False)
-
-# Portfolio summary
-total_profit = df_result["Total Profit"].sum()
-final_value = initial_capital + total_profit
-years_total = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.25
-portfolio_cagr = ((final_value / initial_capital) ** (1 / years_total) - 1) * 100
-
-print(f"\nTotal Portfolio Profit: ₹{round(total_profit, 2)}")
-print(f"Portfolio CAGR: {round(portfolio_cagr, 2)}%")
+# The driver sits under a main guard so ProcessPoolExecutor workers
+# can import this module without re-running the fetch and pool
+# creation under the spawn/forkserver start methods
+if __name__ == "__main__":
+    start_date = "2010-01-01"
+    end_date = datetime.today().strftime("%Y-%m-%d")
+    initial_capital = 100000
+
+    # Cache-first fetch: frames younger than the TTL are read back from the
+    # shared parquet cache (same keys the other weekly scripts use), and
+    # only the misses go to Yahoo, still in one threaded bulk request
+    frames = {}
+    missing = []
+    for ticker in dict.fromkeys(nifty50_tickers):
+        cached = load_cached_data(f"{ticker}_{start_date}_1wk", ttl=CACHE_TTL_SECONDS)
+        if cached is not None and not cached.empty:
+            frames[ticker] = cached
+        else:
+            missing.append(ticker)
+
+    if missing:
+        data = yf.download(missing, start=start_date, end=end_date, interval='1wk',
+                           group_by='ticker', threads=True, auto_adjust=True, progress=False)
+        for ticker in missing:
+            try:
+                df = data[ticker].dropna(how='all')
+            except KeyError:
+                df = pd.DataFrame()
+            if not df.empty:
+                save_cache_data(f"{ticker}_{start_date}_1wk", df)
+            frames[ticker] = df
+
+    dfs = []
+    for ticker in nifty50_tickers:
+        print(f"Processing {ticker}...")
+        dfs.append(frames[ticker])
+
+    # Each ticker's backtest is independent and the data is already local,
+    # so the CPU-bound scans spread across cores; map preserves input order
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        results = list(ex.map(detect_weinstein_signals, nifty50_tickers, dfs,
+                              [initial_capital] * len(nifty50_tickers)))
+
+    # Final Results DataFrame; per-ticker CAGR in one vectorized pass over
+    # the span endpoints instead of scalar datetime math inside each worker.
+    # Tickers with no data (NaT span) or a degenerate one-bar span come out
+    # as 0, matching the old per-ticker fallback
+    df_result = pd.DataFrame(results)
+    days = (df_result["Last"] - df_result["First"]).dt.days
+    final_cash = initial_capital + df_result["Total Profit"]
+    df_result["CAGR (%)"] = (((final_cash / initial_capital)
+                              ** (365.25 / days.where(days > 0)) - 1) * 100
+                             ).fillna(0).round(2)
+    df_result = df_result.drop(columns=["First", "Last"])
+    df_result = df_result.sort_values(by="CAGR (%)", ascending=False)
+
+    # Display summary
+    print(df_result[['Ticker', 'Trades', 'Total Profit', 'CAGR (%)', 'Successful Trades']])
+
+    # Save detailed trades for the top stock; Trade Details is already a
+    # DataFrame, serialized straight to CSV
+    top_stock = df_result.iloc[0]['Ticker']
+    top_stock_details = next(r for r in results if r['Ticker'] == top_stock)
+    top_stock_details['Trade Details'].to_csv(
+        f"{top_stock}_profitable_trade_details.csv", index=False)
+
+    # Portfolio summary
+    total_profit = df_result["Total Profit"].sum()
+    final_value = initial_capital + total_profit
+    years_total = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.25
+    portfolio_cagr = ((final_value / initial_capital) ** (1 / years_total) - 1) * 100
+
+    print(f"\nTotal Portfolio Profit: ₹{round(total_profit, 2)}")
+    print(f"Portfolio CAGR: {round(portfolio_cagr, 2)}%")
 
 """
 Processing RELIANCE.NS...
@@ -1,8 +1,11 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from _njit import ewma9, run_weinstein
+from ema_common import load_or_download_weekly
+
 # Full Nifty 50 stock list
 nifty50_tickers = [
     "RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS",
@@ -17,18 +20,29 @@ nifty50_tickers = [
     "VEDL.NS", "COALINDIA.NS"
 ]
 
+# 30-week WMA weights, normalised once at import; the old rolling lambda
+# rebuilt np.arange(1, 31) and its sum on every window
+_WMA_W = np.arange(1, 31, dtype=np.float64)
+_WMA_W /= _WMA_W.sum()
+
 # Calculate 30-week WMA, slope, and 9-week EMA
 def compute_wma_and_slope(df):
-    df['WMA'] = df['Close'].rolling(window=30).apply(
-        lambda prices: np.dot(prices, np.arange(1, 31)) / np.arange(1, 31).sum(), raw=True
-    )
-    df['WMA_Slope'] = df['WMA'].diff(1)
-    df['EMA9'] = df['Close'].ewm(span=9, adjust=False).mean()
+    # A single convolution over the raw array replaces one Python
+    # callback (and two array allocations) per window
+    close = df['Close'].to_numpy(dtype=np.float64)
+    wma = np.full(close.size, np.nan)
+    if close.size >= 30:
+        wma[29:] = np.convolve(close, _WMA_W[::-1], mode='valid')
+    df['WMA'] = wma
+    df['WMA_Slope'] = np.diff(wma, prepend=np.nan)
+    # Same recurrence as ewm(span=9, adjust=False).mean(), minus the
+    # pandas EWM object built on every one of the 46 calls
+    df['EMA9'] = ewma9(close)
     return df
 
 def detect_weinstein_signals(ticker, start, end, capital=100000):
     try:
-        df = yf.download(ticker, start=start, end=end, interval='1wk', auto_adjust=True, progress=False)
+        df = load_or_download_weekly(ticker, start, end)
 
         if df.empty or len(df) < 40:
             return {
@@ -42,85 +56,35 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
 
         df = compute_wma_and_slope(df)
 
-        in_position = False
-        entry_price = 0
-        trades = 0
-        cash = capital
-        shares = 0
-        entry_date = None
-        trade_details = []
-
-        # For tracking breakdown candles
-        breakdown_candle_low = None
-
-        for i in range(30, len(df)):
-            close = float(df["Close"].iloc[i])
-            wma = float(df["WMA"].iloc[i])
-            slope = float(df["WMA_Slope"].iloc[i])
-            ema9 = float(df["EMA9"].iloc[i])
-            low = float(df["Low"].iloc[i])  # Weekly low
-
-            if pd.isna(close) or pd.isna(wma) or pd.isna(slope) or pd.isna(ema9):
-                continue
-
-            # BUY CONDITION:
-            # 1. Close > WEMA (EMA9)
-            # 2. Close > WMA
-            # 3. Slope > 0
-            if not in_position and close > ema9 and close > wma and slope > 0:
-                entry_price = close
-                shares = cash // entry_price
-                if shares > 0:
-                    cash -= shares * entry_price
-                    in_position = True
-                    entry_date = df.index[i]
-                    # Reset breakdown candle info
-                    breakdown_candle_low = None
-                    current_trade = {
-                        "Entry Date": entry_date,
-                        "Entry Price": entry_price,
-                        "Exit Date": None,
-                        "Exit Price": None,
-                        "Profit": None
-                    }
-
-            # Track breakdown candle if close below 9 WEMA
-            if in_position and close < ema9:
-                if breakdown_candle_low is None:
-                    breakdown_candle_low = low
-
-            # Exit condition:
-            # When a breakdown candle was identified AND next candle closes below that candle's low
-            if in_position and breakdown_candle_low is not None:
-                if close < breakdown_candle_low:
-                    exit_price = close
-                    cash += shares * exit_price
-                    trades += 1
-                    profit = (exit_price - entry_price) * shares
-                    if profit > 0:
-                        current_trade["Exit Date"] = df.index[i]
-                        current_trade["Exit Price"] = exit_price
-                        current_trade["Profit"] = profit
-                        trade_details.append(current_trade)
-                    in_position = False
-                    shares = 0
-                    breakdown_candle_low = None
-
-        # Final sell if still holding position
-        if in_position:
-            final_price = float(df["Close"].iloc[-1])
-            cash += shares * final_price
-            trades += 1
-            profit = (final_price - entry_price) * shares
-            if profit > 0:
-                current_trade["Exit Date"] = df.index[-1]
-                current_trade["Exit Price"] = final_price
-                current_trade["Profit"] = profit
-                trade_details.append(current_trade)
+        # The per-bar state machine runs in the compiled kernel on raw
+        # arrays; the loop here used to pay five .iloc lookups per bar
+        close_arr = df["Close"].to_numpy(dtype=np.float64)
+        wma_arr = df["WMA"].to_numpy(dtype=np.float64)
+        slope_arr = df["WMA_Slope"].to_numpy(dtype=np.float64)
+        ema9_arr = df["EMA9"].to_numpy(dtype=np.float64)
+        low_arr = df["Low"].to_numpy(dtype=np.float64)
+
+        cash, trades, entry_idx, exit_idx, entry_px, exit_px, trade_shares = run_weinstein(
+            close_arr, wma_arr, slope_arr, ema9_arr, low_arr, float(capital)
+        )
+
+        # Keep only profitable trades in the log, as before
+        profits = (exit_px[:trades] - entry_px[:trades]) * trade_shares[:trades]
+        trade_details = [
+            {
+                "Entry Date": df.index[entry_idx[k]],
+                "Entry Price": entry_px[k],
+                "Exit Date": df.index[exit_idx[k]],
+                "Exit Price": exit_px[k],
+                "Profit": profits[k]
+            }
+            for k in range(trades) if profits[k] > 0
+        ]
 
         total_profit = cash - capital
         successful_trades = len(trade_details)
-        years = (df.index[-1] - df.index[0]).days / 365.25
+        # Plain datetime64 subtraction; no Timedelta object construction
+        years = (df.index.values[-1] - df.index.values[0]).astype('timedelta64[D]').astype(np.int64) / 365.25
         cagr = ((cash / capital) ** (1 / years) - 1) * 100
 
         return {
@@ -148,11 +112,14 @@ start_date = "2010-01-01"
 end_date = datetime.today().strftime("%Y-%m-%d")
 initial_capital = 100000
 
-results = []
-for ticker in nifty50_tickers:
+def process_ticker(ticker):
     print(f"Processing {ticker}...")
-    result = detect_weinstein_signals(ticker, start=start_date, end=end_date, capital=initial_capital)
-    results.append(result)
+    return detect_weinstein_signals(ticker, start=start_date, end=end_date, capital=initial_capital)
+
+# The downloads dominate wall time and block in the socket layer, so a
+# thread pool overlaps them; results keep the ticker-list order
+with ThreadPoolExecutor(max_workers=min(16, len(nifty50_tickers))) as pool:
+    results = list(pool.map(process_ticker, nifty50_tickers))
 
 # Convert results to DataFrame
 df_result = pd.DataFrame(results)
@@ -1,18 +1,24 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import requests
 from datetime import datetime
 
+from _njit import weinstein_indicators
+from ema_common import load_or_download_weekly
+
 # --- Telegram setup ---
 TELEGRAM_BOT_TOKEN = 'YOUR_TELEGRAM_BOT_TOKEN'  # Replace
 CHAT_ID = 'YOUR_CHAT_ID'  # Replace
 
+# One pooled session so repeated alerts reuse the TCP/TLS connection
+_SESSION = requests.Session()
+_SESSION.headers.update({"Connection": "keep-alive"})
+
 def send_telegram_message(message):
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {'chat_id': CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
     try:
-        requests.post(url, data=payload)
+        _SESSION.post(url, data=payload, timeout=5)
     except Exception as e:
         print(f"Failed to send message: {e}")
 
@@ -26,16 +32,17 @@ nifty50_tickers = [
 position_status = {ticker: False for ticker in nifty50_tickers}
 
 def compute_wma_and_slope(df):
-    df['WMA'] = df['Close'].rolling(window=30).apply(
-        lambda prices: np.dot(prices, np.arange(1, 31)) / np.arange(1, 31).sum(), raw=True
-    )
-    df['WMA_Slope'] = df['WMA'].diff(1)
-    df['EMA9'] = df['Close'].ewm(span=9, adjust=False).mean()
+    # The fused kernel writes all three indicator columns in one pass
+    # over the close array instead of three separate pandas traversals
+    wma, slope, ema9 = weinstein_indicators(df['Close'].to_numpy(dtype=np.float64))
+    df['WMA'] = wma
+    df['WMA_Slope'] = slope
+    df['EMA9'] = ema9
     return df
 
 def detect_weinstein_signals(ticker, start, end, capital=100000, position_status=None):
     try:
-        df = yf.download(ticker, start=start, end=end, interval='1wk', auto_adjust=True, progress=False)
+        df = load_or_download_weekly(ticker, start, end)
         if df.empty or len(df) < 40:
             return {
                 "Ticker": ticker,
@@ -54,6 +61,9 @@ def detect_weinstein_signals(ticker, start, end, capital=100000, position_status
         entry_price = 0
         entry_date = None
         trade_details = []
+        # Alerts are buffered and sent as one message after the loop;
+        # a synchronous POST per signal would stall the backtest
+        alerts = []
 
         breakdown_candle_low = None
 
@@ -78,7 +88,7 @@ def detect_weinstein_signals(ticker, start, end, capital=100000, position_status
                         in_position = True
                         position_status[ticker] = True
                         entry_date = df.index[i]
-                        send_telegram_message(f"🟢 *BUY* {ticker} at {entry_price:.2f} on {entry_date.date()}")
+                        alerts.append(f"🟢 *BUY* {ticker} at {entry_price:.2f} on {entry_date.date()}")
                         current_trade = {
                             "Entry Date": entry_date,
                             "Entry Price": entry_price,
@@ -102,7 +112,7 @@ def detect_weinstein_signals(ticker, start, end, capital=100000, position_status
                     profit = (exit_price - entry_price) * shares
                     # Only alert if profit
                     if profit > 0:
-                        send_telegram_message(f"🔴 *SELL* {ticker} at {exit_price:.2f} on {df.index[i].date()}")
+                        alerts.append(f"🔴 *SELL* {ticker} at {exit_price:.2f} on {df.index[i].date()}")
                         current_trade["Exit Date"] = df.index[i]
                         current_trade["Exit Price"] = exit_price
                         current_trade["Profit"] = profit
@@ -119,7 +129,7 @@ def detect_weinstein_signals(ticker, start, end, capital=100000, position_status
             trades += 1
             profit = (final_price - entry_price) * shares
             if profit > 0:
-                send_telegram_message(f"🔴 *SELL* {ticker} at {final_price:.2f} on {df.index[-1].date()}")
+                alerts.append(f"🔴 *SELL* {ticker} at {final_price:.2f} on {df.index[-1].date()}")
                 current_trade["Exit Date"] = df.index[-1]
                 current_trade["Exit Price"] = final_price
                 current_trade["Profit"] = profit
@@ -127,9 +137,14 @@ def detect_weinstein_signals(ticker, start, end, capital=100000, position_status
             in_position = False
             position_status[ticker] = False
 
+        # One POST for the whole ticker instead of one per signal
+        if alerts:
+            send_telegram_message("\n".join(alerts))
+
         total_profit = cash - capital
         successful_trades = len([t for t in trade_details if t['Profit'] and t['Profit'] > 0])
-        years = (df.index[-1] - df.index[0]).days / 365.25
+        # Plain datetime64 subtraction; no Timedelta object construction
+        years = (df.index.values[-1] - df.index.values[0]).astype('timedelta64[D]').astype(np.int64) / 365.25
         if years > 0:
             cagr = ((cash / capital) ** (1 / years) - 1) * 100
         else:
@@ -0,0 +1,756 @@
+"""Shared Numba-accelerated kernels for the trading scripts.
+
+numba is optional: when it is not installed the kernels fall back to
+vectorised NumPy implementations with identical results, so the scripts
+keep working from the plain requirements.txt install.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+def _wma_numpy(close, window):
+    """Weighted moving average with linear weights 1..window (NumPy path)."""
+    weights = np.arange(1, window + 1, dtype=np.float64)
+    weights /= weights.sum()
+    out = np.full(close.size, np.nan)
+    if close.size >= window:
+        out[window - 1:] = sliding_window_view(close, window) @ weights
+    return out
+
+
+def _ewma_numpy(x, alpha):
+    """One-pass exponential moving average recurrence (NumPy path).
+
+    Seeds at the first valid value; a NaN input emits NaN for that bar
+    but keeps the running state, so one bad close cannot poison the
+    rest of the series.
+    """
+    out = np.empty_like(x)
+    prev = np.nan
+    for i in range(x.size):
+        xi = x[i]
+        if xi != xi:
+            out[i] = np.nan
+        elif prev != prev:
+            prev = xi
+            out[i] = xi
+        else:
+            prev = alpha * xi + (1.0 - alpha) * prev
+            out[i] = prev
+    return out
+
+
+def _find_breakdown_numpy(close, ema):
+    """Latest index where close crosses from above EMA to below (NumPy path)."""
+    mask = (close[:-1] > ema[:-1]) & (close[1:] < ema[1:])
+    hits = np.flatnonzero(mask)
+    if hits.size == 0:
+        return -1
+    return int(hits[-1]) + 1
+
+
+def _scan_breakdown_numpy(close, low, alpha):
+    """Fused EMA + crossover scan (NumPy path). Returns (index, low)."""
+    ema = _ewma_numpy(close, alpha)
+    idx = _find_breakdown_numpy(close, ema)
+    if idx < 0:
+        return -1, np.nan
+    return idx, low[idx]
+
+
+def _ewma9_numpy(x):
+    """EMA9 (alpha = 0.2) via the generic recurrence (NumPy path)."""
+    return _ewma_numpy(x, 0.2)
+
+
+def _weinstein_indicators_numpy(close):
+    """30-week WMA, its slope, and EMA9 in one call (NumPy path)."""
+    wma = _wma_numpy(close, 30)
+    slope = np.diff(wma, prepend=np.nan)
+    return wma, slope, _ewma9_numpy(close)
+
+
+def _run_weinstein_numpy(close, wma, slope, ema9, low, capital):
+    """Weinstein entry/exit state machine over raw arrays (interpreter path)."""
+    n = close.size
+    entry_idx = np.empty(n, dtype=np.int64)
+    exit_idx = np.empty(n, dtype=np.int64)
+    entry_px = np.empty(n)
+    exit_px = np.empty(n)
+    trade_shares = np.empty(n)
+    cash = capital
+    shares = 0.0
+    in_position = False
+    entry_price = 0.0
+    entry_i = -1
+    blow = np.nan
+    n_trades = 0
+    # Leading NaNs all come from the indicator warm-up, so skip past them
+    # once instead of re-testing four values every bar. Any stray NaN bar
+    # after the warm-up is harmless anyway: NaN fails every ordered
+    # comparison, so such a bar can neither open, arm nor close a trade.
+    valid = ~(np.isnan(close) | np.isnan(wma) | np.isnan(slope) | np.isnan(ema9))
+    start = max(30, int(np.argmax(valid)))
+    for i in range(start, n):
+        c = close[i]
+        w = wma[i]
+        s = slope[i]
+        e = ema9[i]
+        if not in_position and c > e and c > w and s > 0.0:
+            entry_price = c
+            shares = np.floor(cash / entry_price)
+            if shares > 0.0:
+                cash -= shares * entry_price
+                in_position = True
+                entry_i = i
+                blow = np.nan
+        if in_position and c < e and blow != blow:
+            blow = low[i]
+        if in_position and blow == blow and c < blow:
+            cash += shares * c
+            entry_idx[n_trades] = entry_i
+            exit_idx[n_trades] = i
+            entry_px[n_trades] = entry_price
+            exit_px[n_trades] = c
+            trade_shares[n_trades] = shares
+            n_trades += 1
+            in_position = False
+            shares = 0.0
+            blow = np.nan
+    if in_position:
+        final_price = close[n - 1]
+        cash += shares * final_price
+        entry_idx[n_trades] = entry_i
+        exit_idx[n_trades] = n - 1
+        entry_px[n_trades] = entry_price
+        exit_px[n_trades] = final_price
+        trade_shares[n_trades] = shares
+        n_trades += 1
+    return cash, n_trades, entry_idx, exit_idx, entry_px, exit_px, trade_shares
+
+
+def _four_emas_numpy(close, a200, a50, a20, a9):
+    """Four EMA recurrences over one close array (NumPy path)."""
+    return (_ewma_numpy(close, a200), _ewma_numpy(close, a50),
+            _ewma_numpy(close, a20), _ewma_numpy(close, a9))
+
+
+def _run_momentum_numpy(close, low, ema200, ema50, ema20, ema9, capital):
+    """Momentum entry/exit state machine over raw arrays (interpreter path)."""
+    n = close.size
+    entry_idx = np.empty(n, dtype=np.int64)
+    exit_idx = np.empty(n, dtype=np.int64)
+    entry_px = np.empty(n)
+    exit_px = np.empty(n)
+    trade_shares = np.empty(n)
+    # Cash is tracked in integer cents: exact and reproducible across
+    # the jitted and interpreted paths, no fp accumulation drift
+    cash_c = np.int64(capital * 100.0 + 0.5)
+    shares = np.int64(0)
+    in_position = False
+    entry_price = 0.0
+    entry_i = -1
+    blow = np.nan
+    n_trades = 0
+    forced_close = False
+    for i in range(200, n):
+        c = close[i]
+        if c != c:
+            continue
+        if (not in_position and c > ema200[i] and c > ema50[i]
+                and c > ema20[i] and c > ema9[i]):
+            entry_price = c
+            price_c = np.int64(entry_price * 100.0 + 0.5)
+            shares = cash_c // price_c
+            if shares > 0:
+                cash_c -= shares * price_c
+                in_position = True
+                entry_i = i
+                blow = np.nan
+        if in_position and c < ema9[i] and blow != blow:
+            blow = low[i]
+        if in_position and blow == blow and c < blow:
+            cash_c += shares * np.int64(c * 100.0 + 0.5)
+            entry_idx[n_trades] = entry_i
+            exit_idx[n_trades] = i
+            entry_px[n_trades] = entry_price
+            exit_px[n_trades] = c
+            trade_shares[n_trades] = shares
+            n_trades += 1
+            in_position = False
+            shares = np.int64(0)
+            blow = np.nan
+    if in_position and close[n - 1] == close[n - 1]:
+        final_price = close[n - 1]
+        cash_c += shares * np.int64(final_price * 100.0 + 0.5)
+        entry_idx[n_trades] = entry_i
+        exit_idx[n_trades] = n - 1
+        entry_px[n_trades] = entry_price
+        exit_px[n_trades] = final_price
+        trade_shares[n_trades] = shares
+        n_trades += 1
+        forced_close = True
+    return cash_c / 100.0, n_trades, entry_idx, exit_idx, entry_px, exit_px, trade_shares, forced_close
+
+
+def _run_momentum_all_numpy(closes, lows, ema200s, ema50s, ema20s, ema9s,
+                            lengths, capital):
+    """Momentum backtest over a NaN-padded ticker stack (interpreter path)."""
+    n_tickers, n_bars = closes.shape
+    cash_out = np.empty(n_tickers)
+    trades_out = np.empty(n_tickers, dtype=np.int64)
+    entry_idx = np.empty((n_tickers, n_bars), dtype=np.int64)
+    exit_idx = np.empty((n_tickers, n_bars), dtype=np.int64)
+    entry_px = np.empty((n_tickers, n_bars))
+    exit_px = np.empty((n_tickers, n_bars))
+    trade_shares = np.empty((n_tickers, n_bars))
+    forced = np.zeros(n_tickers, dtype=np.bool_)
+    for t in range(n_tickers):
+        m = lengths[t]
+        cash, n_trades, ei, xi, ep, xp, sh, fc = _run_momentum_numpy(
+            closes[t, :m], lows[t, :m], ema200s[t, :m], ema50s[t, :m],
+            ema20s[t, :m], ema9s[t, :m], capital)
+        cash_out[t] = cash
+        trades_out[t] = n_trades
+        entry_idx[t, :n_trades] = ei[:n_trades]
+        exit_idx[t, :n_trades] = xi[:n_trades]
+        entry_px[t, :n_trades] = ep[:n_trades]
+        exit_px[t, :n_trades] = xp[:n_trades]
+        trade_shares[t, :n_trades] = sh[:n_trades]
+        forced[t] = fc
+    return (cash_out, trades_out, entry_idx, exit_idx, entry_px, exit_px,
+            trade_shares, forced)
+
+
+def _scan_breakdown_all_numpy(closes, lows, alpha):
+    """Row-by-row scan over a NaN-padded symbol stack (NumPy path)."""
+    n_sym = closes.shape[0]
+    idx_out = np.full(n_sym, -1, dtype=np.int64)
+    low_out = np.full(n_sym, np.nan)
+    for s in range(n_sym):
+        nan_mask = np.isnan(closes[s])
+        t = int(np.argmax(nan_mask)) if nan_mask.any() else closes.shape[1]
+        if t < 2:
+            continue
+        idx_out[s], low_out[s] = _scan_breakdown_numpy(closes[s, :t], lows[s, :t], alpha)
+    return idx_out, low_out
+
+
+if HAVE_NUMBA:
+
+    @njit(cache=True)
+    def wma(close, window):
+        """Weighted moving average with linear weights 1..window."""
+        n = close.size
+        out = np.full(n, np.nan)
+        wsum = window * (window + 1) / 2.0
+        for i in range(window - 1, n):
+            s = 0.0
+            for j in range(window):
+                s += close[i - window + 1 + j] * (j + 1)
+            out[i] = s / wsum
+        return out
+
+    @njit(cache=True)
+    def ewma(x, alpha):
+        """One-pass exponential moving average recurrence.
+
+        Matches pandas ewm(span=s, adjust=False).mean() with alpha=2/(s+1)
+        on clean input, seeding at the first valid value. A NaN input
+        emits NaN for that bar but keeps the running state, so one bad
+        close cannot poison the rest of the series.
+        """
+        out = np.empty_like(x)
+        prev = np.nan
+        for i in range(x.size):
+            xi = x[i]
+            if xi != xi:
+                out[i] = np.nan
+            elif prev != prev:
+                prev = xi
+                out[i] = xi
+            else:
+                prev = alpha * xi + (1.0 - alpha) * prev
+                out[i] = prev
+        return out
+
+    @njit(cache=True)
+    def scan_breakdown(close, low, alpha):
+        """Fused EMA recurrence plus crossover scan in a single pass.
+
+        Keeps only scalar EMA state (no intermediate array) and returns
+        (breakdown index, breakdown low) for the most recent crossover,
+        or (-1, nan) when none exists. Only the latest breakdown governs
+        the exit check, so earlier, stale crossovers are ignored.
+        """
+        idx = -1
+        blow = np.nan
+        if close.size == 0:
+            return idx, blow
+        ema_prev = close[0]
+        for i in range(1, close.size):
+            ema = alpha * close[i] + (1.0 - alpha) * ema_prev
+            if close[i - 1] > ema_prev and close[i] < ema:
+                idx = i
+                blow = low[i]
+            ema_prev = ema
+        return idx, blow
+
+    # No fastmath: the NaN checks below need strict IEEE comparisons
+    @njit('f8[:](f8[::1])', cache=True)
+    def ewma9(x):
+        """EMA9 recurrence unrolled four-wide with span-9 constants baked in.
+
+        Telescoping the recurrence gives
+        s[i+3] = 0.4096*s[i-1] + 0.1024*x[i] + 0.128*x[i+1] + 0.16*x[i+2] + 0.2*x[i+3],
+        so the loop-carried dependency advances once per four elements
+        instead of once per element. Seeds at the first valid value; a
+        NaN input emits NaN for that bar but keeps the running state.
+        Clean blocks take the unrolled path, a block with a NaN falls
+        back to the scalar recurrence.
+        """
+        n = x.size
+        out = np.empty_like(x)
+        prev = np.nan
+        i = 0
+        while i < n:
+            xi = x[i]
+            if xi != xi:
+                out[i] = np.nan
+                i += 1
+            else:
+                prev = xi
+                out[i] = xi
+                i += 1
+                break
+        while i + 3 < n:
+            x0 = x[i]
+            x1 = x[i + 1]
+            x2 = x[i + 2]
+            x3 = x[i + 3]
+            if x0 == x0 and x1 == x1 and x2 == x2 and x3 == x3:
+                s = prev
+                out[i] = 0.2 * x0 + 0.8 * s
+                out[i + 1] = 0.2 * x1 + 0.16 * x0 + 0.64 * s
+                out[i + 2] = 0.2 * x2 + 0.16 * x1 + 0.128 * x0 + 0.512 * s
+                prev = (0.2 * x3 + 0.16 * x2 + 0.128 * x1
+                        + 0.1024 * x0 + 0.4096 * s)
+                out[i + 3] = prev
+            else:
+                for k in range(4):
+                    xk = x[i + k]
+                    if xk != xk:
+                        out[i + k] = np.nan
+                    else:
+                        prev = 0.2 * xk + 0.8 * prev
+                        out[i + k] = prev
+            i += 4
+        while i < n:
+            xi = x[i]
+            if xi != xi:
+                out[i] = np.nan
+            else:
+                prev = 0.2 * xi + 0.8 * prev
+                out[i] = prev
+            i += 1
+        return out
+
+    @njit(cache=True, parallel=True)
+    def scan_breakdown_all(closes, lows, alpha):
+        """Fused EMA + crossover scan over a stack of symbols in parallel.
+
+        Rows shorter than the matrix width are NaN-padded on the right and
+        each row's scan stops at the first NaN. Returns per-row
+        (index, low) arrays for each row's most recent crossover, with
+        -1/nan for rows without one.
+        """
+        n_sym = closes.shape[0]
+        idx_out = np.full(n_sym, -1, dtype=np.int64)
+        low_out = np.full(n_sym, np.nan)
+        for s in prange(n_sym):
+            if closes.shape[1] == 0 or np.isnan(closes[s, 0]):
+                continue
+            ema_prev = closes[s, 0]
+            for i in range(1, closes.shape[1]):
+                c = closes[s, i]
+                if np.isnan(c):
+                    break
+                ema = alpha * c + (1.0 - alpha) * ema_prev
+                if closes[s, i - 1] > ema_prev and c < ema:
+                    idx_out[s] = i
+                    low_out[s] = lows[s, i]
+                ema_prev = ema
+        return idx_out, low_out
+
+    @njit('Tuple((f8[:], f8[:], f8[:]))(f8[::1])', cache=True)
+    def weinstein_indicators(close):
+        """30-week WMA, its slope, and EMA9 fused into a single pass.
+
+        Computed separately, each indicator streams the whole close
+        array through the cache again; fused, one traversal writes all
+        three output arrays. Slope and EMA stay NaN/seeded exactly as
+        the pandas diff/ewm versions produce them.
+        """
+        n = close.size
+        wma = np.full(n, np.nan)
+        slope = np.full(n, np.nan)
+        ema = np.empty(n)
+        if n == 0:
+            return wma, slope, ema
+        ema[0] = close[0]
+        den = 30.0 * 31.0 / 2.0
+        # Running plain and weighted window sums. Dropping the oldest
+        # element decrements every remaining weight by one, so the
+        # weighted sum rolls forward as ws - s + 30*new: O(1) per bar
+        # instead of a 30-element dot product.
+        s_win = 0.0
+        ws_win = 0.0
+        if n >= 30:
+            for j in range(30):
+                s_win += close[j]
+                ws_win += close[j] * (j + 1)
+        for i in range(1, n):
+            ema[i] = 0.2 * close[i] + 0.8 * ema[i - 1]
+            if i == 29:
+                wma[i] = ws_win / den
+            elif i >= 30:
+                ws_win = ws_win - s_win + 30.0 * close[i]
+                s_win = s_win - close[i - 30] + close[i]
+                wma[i] = ws_win / den
+                slope[i] = wma[i] - wma[i - 1]
+        return wma, slope, ema
+
+    # Explicit signature: compiled at import, so the first ticker pays no
+    # lazy-dispatch type inference and the on-disk cache entry is typed
+    # once for every caller. No fastmath here — the NaN warm-up scan and
+    # the NaN breakdown-low sentinel rely on strict IEEE comparisons.
+    @njit('Tuple((f8, i8, i8[:], i8[:], f8[:], f8[:], f8[:]))'
+          '(f8[::1], f8[::1], f8[::1], f8[::1], f8[::1], f8)', cache=True)
+    def run_weinstein(close, wma, slope, ema9, low, capital):
+        """Weinstein entry/exit state machine over raw float64 arrays.
+
+        Translates the per-bar backtest loop one-to-one: enter when close
+        is above both the EMA9 and the WMA with a positive slope, arm the
+        breakdown low on the first close under the EMA9, exit when close
+        drops below that low, and cash out any open position on the last
+        bar. Trades are written into preallocated index/price arrays;
+        only the first n_trades entries of each are meaningful.
+        """
+        n = close.size
+        entry_idx = np.empty(n, dtype=np.int64)
+        exit_idx = np.empty(n, dtype=np.int64)
+        entry_px = np.empty(n)
+        exit_px = np.empty(n)
+        trade_shares = np.empty(n)
+        cash = capital
+        shares = 0.0
+        in_position = False
+        entry_price = 0.0
+        entry_i = -1
+        blow = np.nan
+        n_trades = 0
+        # Skip the indicator warm-up head once; NaN bars after it fail
+        # every ordered comparison below, so no per-bar guard is needed
+        start = 30
+        while start < n and (close[start] != close[start]
+                             or wma[start] != wma[start]
+                             or slope[start] != slope[start]
+                             or ema9[start] != ema9[start]):
+            start += 1
+        for i in range(start, n):
+            c = close[i]
+            w = wma[i]
+            s = slope[i]
+            e = ema9[i]
+            if not in_position and c > e and c > w and s > 0.0:
+                entry_price = c
+                shares = np.floor(cash / entry_price)
+                if shares > 0.0:
+                    cash -= shares * entry_price
+                    in_position = True
+                    entry_i = i
+                    blow = np.nan
+            if in_position and c < e and blow != blow:
+                blow = low[i]
+            if in_position and blow == blow and c < blow:
+                cash += shares * c
+                entry_idx[n_trades] = entry_i
+                exit_idx[n_trades] = i
+                entry_px[n_trades] = entry_price
+                exit_px[n_trades] = c
+                trade_shares[n_trades] = shares
+                n_trades += 1
+                in_position = False
+                shares = 0.0
+                blow = np.nan
+        if in_position:
+            final_price = close[n - 1]
+            cash += shares * final_price
+            entry_idx[n_trades] = entry_i
+            exit_idx[n_trades] = n - 1
+            entry_px[n_trades] = entry_price
+            exit_px[n_trades] = final_price
+            trade_shares[n_trades] = shares
+            n_trades += 1
+        return cash, n_trades, entry_idx, exit_idx, entry_px, exit_px, trade_shares
+
+    @njit(cache=True)
+    def four_emas(close, a200, a50, a20, a9):
+        """Four EMA recurrences fused into a single pass over close.
+
+        Run separately, each recurrence streams the whole close array
+        from memory again; fused, the four running states stay in
+        registers and the input is read once. Seeds at the first valid
+        close; a NaN close emits NaN for that bar but keeps all four
+        running states, so one bad row cannot poison the rest of the
+        series.
+        """
+        n = close.size
+        out200 = np.empty(n)
+        out50 = np.empty(n)
+        out20 = np.empty(n)
+        out9 = np.empty(n)
+        y200 = np.nan
+        y50 = np.nan
+        y20 = np.nan
+        y9 = np.nan
+        for i in range(n):
+            c = close[i]
+            if c != c:
+                out200[i] = np.nan
+                out50[i] = np.nan
+                out20[i] = np.nan
+                out9[i] = np.nan
+                continue
+            if y200 != y200:
+                y200 = c
+                y50 = c
+                y20 = c
+                y9 = c
+            else:
+                y200 = a200 * c + (1.0 - a200) * y200
+                y50 = a50 * c + (1.0 - a50) * y50
+                y20 = a20 * c + (1.0 - a20) * y20
+                y9 = a9 * c + (1.0 - a9) * y9
+            out200[i] = y200
+            out50[i] = y50
+            out20[i] = y20
+            out9[i] = y9
+        return out200, out50, out20, out9
+
+    @njit(cache=True)
+    def run_momentum(close, low, ema200, ema50, ema20, ema9, capital):
+        """Momentum entry/exit state machine over raw price arrays.
+
+        Callers may pass float32 or float64 inputs; the dispatcher
+        specializes per dtype and cash accumulates in integer cents
+        either way, returned as rupees.
+
+        Enter when close clears all four EMAs, arm the breakdown low on
+        the first close under the EMA9, exit when close drops below
+        that low, and force-close any open position on the last bar.
+        Mirrors run_weinstein's layout: trades land in preallocated
+        index/price/share arrays, only the first n_trades entries are
+        meaningful, and the final flag reports whether the last trade
+        was a forced close.
+        """
+        n = close.size
+        entry_idx = np.empty(n, dtype=np.int64)
+        exit_idx = np.empty(n, dtype=np.int64)
+        entry_px = np.empty(n)
+        exit_px = np.empty(n)
+        trade_shares = np.empty(n)
+        # Cash in integer cents: the branchy path stays in cheap int64
+        # ops and totals reproduce exactly across runs and paths
+        cash_c = np.int64(capital * 100.0 + 0.5)
+        shares = np.int64(0)
+        in_position = False
+        entry_price = 0.0
+        entry_i = -1
+        blow = np.nan
+        n_trades = 0
+        forced_close = False
+        for i in range(200, n):
+            c = close[i]
+            if c != c:
+                continue
+            if (not in_position and c > ema200[i] and c > ema50[i]
+                    and c > ema20[i] and c > ema9[i]):
+                entry_price = c
+                price_c = np.int64(entry_price * 100.0 + 0.5)
+                shares = cash_c // price_c
+                if shares > 0:
+                    cash_c -= shares * price_c
+                    in_position = True
+                    entry_i = i
+                    blow = np.nan
+            if in_position and c < ema9[i] and blow != blow:
+                blow = low[i]
+            if in_position and blow == blow and c < blow:
+                cash_c += shares * np.int64(c * 100.0 + 0.5)
+                entry_idx[n_trades] = entry_i
+                exit_idx[n_trades] = i
+                entry_px[n_trades] = entry_price
+                exit_px[n_trades] = c
+                trade_shares[n_trades] = shares
+                n_trades += 1
+                in_position = False
+                shares = np.int64(0)
+                blow = np.nan
+        if in_position and close[n - 1] == close[n - 1]:
+            final_price = close[n - 1]
+            cash_c += shares * np.int64(final_price * 100.0 + 0.5)
+            entry_idx[n_trades] = entry_i
+            exit_idx[n_trades] = n - 1
+            entry_px[n_trades] = entry_price
+            exit_px[n_trades] = final_price
+            trade_shares[n_trades] = shares
+            n_trades += 1
+            forced_close = True
+        return cash_c / 100.0, n_trades, entry_idx, exit_idx, entry_px, exit_px, trade_shares, forced_close
+
+    @njit(parallel=True, cache=True)
+    def run_momentum_all(closes, lows, ema200s, ema50s, ema20s, ema9s,
+                         lengths, capital):
+        """Momentum backtest over a NaN-padded ticker stack, in parallel.
+
+        Each row is one ticker's history with lengths[t] real bars; rows
+        are fully independent, so the outer loop is a prange across
+        physical cores with no shared state and no data serialization.
+        Per-ticker trades land in row t of the 2-D output arrays, only
+        the first trades_out[t] entries meaningful; alerting replays
+        them serially after the parallel section.
+        """
+        n_tickers, n_bars = closes.shape
+        cash_out = np.empty(n_tickers)
+        trades_out = np.empty(n_tickers, dtype=np.int64)
+        entry_idx = np.empty((n_tickers, n_bars), dtype=np.int64)
+        exit_idx = np.empty((n_tickers, n_bars), dtype=np.int64)
+        entry_px = np.empty((n_tickers, n_bars))
+        exit_px = np.empty((n_tickers, n_bars))
+        trade_shares = np.empty((n_tickers, n_bars))
+        forced = np.zeros(n_tickers, dtype=np.bool_)
+        for t in prange(n_tickers):
+            m = lengths[t]
+            cash, n_trades, ei, xi, ep, xp, sh, fc = run_momentum(
+                closes[t, :m], lows[t, :m], ema200s[t, :m], ema50s[t, :m],
+                ema20s[t, :m], ema9s[t, :m], capital)
+            cash_out[t] = cash
+            trades_out[t] = n_trades
+            entry_idx[t, :n_trades] = ei[:n_trades]
+            exit_idx[t, :n_trades] = xi[:n_trades]
+            entry_px[t, :n_trades] = ep[:n_trades]
+            exit_px[t, :n_trades] = xp[:n_trades]
+            trade_shares[t, :n_trades] = sh[:n_trades]
+            forced[t] = fc
+        return (cash_out, trades_out, entry_idx, exit_idx, entry_px, exit_px,
+                trade_shares, forced)
+
+    @njit(cache=True)
+    def find_breakdown(close, ema):
+        """Return the latest index where close crosses from above EMA to below.
+
+        Scans backwards from the end so a hit near the tail returns after a
+        few iterations. Returns -1 when no crossover exists.
+        """
+        for i in range(close.size - 1, 0, -1):
+            if close[i - 1] > ema[i - 1] and close[i] < ema[i]:
+                return i
+        return -1
+
+else:
+    wma = _wma_numpy
+    ewma = _ewma_numpy
+    ewma9 = _ewma9_numpy
+    find_breakdown = _find_breakdown_numpy
+    run_weinstein = _run_weinstein_numpy
+    weinstein_indicators = _weinstein_indicators_numpy
+    run_momentum = _run_momentum_numpy
+    run_momentum_all = _run_momentum_all_numpy
+    four_emas = _four_emas_numpy
+    scan_breakdown = _scan_breakdown_numpy
+    scan_breakdown_all = _scan_breakdown_all_numpy
+
+# Kernels compiled ahead of time by build_kernels.py take precedence:
+# loading the shared library has no JIT warmup cost at all
+try:
+    from ema_kernels import ewma, scan_breakdown  # noqa: F811
+except ImportError:
+    pass
+
+
+def make_wma(window):
+    """Build a WMA kernel specialised for a fixed window size.
+
+    With numba available the kernel is compiled eagerly through an explicit
+    signature, so the first call pays no JIT cost and the window is a
+    compile-time constant the loop bounds fold into. Without numba the
+    vectorised NumPy path is returned instead.
+    """
+    if not HAVE_NUMBA:
+        def kernel(close):
+            return _wma_numpy(close, window)
+        return kernel
+
+    weights = np.arange(1, window + 1, dtype=np.float64)
+    wsum = weights.sum()
+
+    @njit('float64[:](float64[::1])', cache=True)
+    def kernel(close):
+        n = close.size
+        out = np.full(n, np.nan)
+        for i in range(window - 1, n):
+            s = 0.0
+            for j in range(window):
+                s += close[i - window + 1 + j] * weights[j]
+            out[i] = s / wsum
+        return out
+
+    return kernel
+
+
+# Specialisation shared by the 30-week Weinstein scripts
+wma30 = make_wma(30)
+
+
+def make_scan_breakdown(alpha):
+    """Build a breakdown-scan kernel with the EMA alpha baked in.
+
+    Closing over alpha makes it a compile-time constant under numba, so
+    LLVM folds alpha and (1 - alpha) straight into the generated loop and
+    the explicit signature compiles the kernel eagerly at import. Without
+    numba the generic path is returned with alpha bound.
+    """
+    if not HAVE_NUMBA:
+        def kernel(close, low):
+            return scan_breakdown(close, low, alpha)
+        return kernel
+
+    one_minus_alpha = 1.0 - alpha
+
+    @njit('Tuple((i8, f8))(f8[::1], f8[::1])', cache=True)
+    def kernel(close, low):
+        idx = -1
+        blow = np.nan
+        if close.size == 0:
+            return idx, blow
+        ema_prev = close[0]
+        for i in range(1, close.size):
+            ema = alpha * close[i] + one_minus_alpha * ema_prev
+            if close[i - 1] > ema_prev and close[i] < ema:
+                idx = i
+                blow = low[i]
+            ema_prev = ema
+        return idx, blow
+
+    return kernel
+
+
+# EMA9 specialisation used by the exit scripts (alpha = 2 / (9 + 1))
+scan_breakdown_ema9 = make_scan_breakdown(2.0 / 10.0)
@@ -0,0 +1,44 @@
+"""Ahead-of-time build for the hot kernels used by the exit-alert scripts.
+
+Running  python build_kernels.py  compiles the EMA recurrence and the
+fused breakdown scan into an `ema_kernels` shared library next to the
+scripts. _njit.py prefers that library on import, which removes the
+LLVM JIT warmup (~500ms) the @njit versions pay on every fresh run —
+worth it when the scripts fire from a scheduler several times a day.
+Requires numba.
+"""
+import numpy as np
+from numba.pycc import CC
+
+cc = CC('ema_kernels')
+
+
+@cc.export('ewma', 'f8[:](f8[:], f8)')
+def ewma(x, alpha):
+    out = np.empty_like(x)
+    if x.size == 0:
+        return out
+    out[0] = x[0]
+    for i in range(1, x.size):
+        out[i] = alpha * x[i] + (1.0 - alpha) * out[i - 1]
+    return out
+
+
+@cc.export('scan_breakdown', 'Tuple((i8, f8))(f8[:], f8[:], f8)')
+def scan_breakdown(close, low, alpha):
+    idx = -1
+    blow = np.nan
+    if close.size == 0:
+        return idx, blow
+    ema_prev = close[0]
+    for i in range(1, close.size):
+        ema = alpha * close[i] + (1.0 - alpha) * ema_prev
+        if close[i - 1] > ema_prev and close[i] < ema:
+            idx = i
+            blow = low[i]
+        ema_prev = ema
+    return idx, blow
+
+
+if __name__ == '__main__':
+    cc.compile()
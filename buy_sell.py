@@ -1,14 +1,21 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import requests
 from datetime import datetime, timedelta
+import math
+import multiprocessing as mp
 import os
 
 # --- Telegram setup ---
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
+# One pooled session so repeated alerts reuse the TCP/TLS connection
+_SESSION = requests.Session()
+_SESSION.headers.update({"Connection": "keep-alive"})
+
 def send_telegram_message(message):
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {
@@ -17,7 +24,7 @@ def send_telegram_message(message):
         'parse_mode': 'Markdown'
     }
     try:
-        requests.post(url, data=payload)
+        _SESSION.post(url, data=payload, timeout=5)
     except Exception as e:
         print(f"Failed to send message: {e}")
 
@@ -35,28 +42,36 @@ nifty50_tickers = [
     "VEDL.NS", "COALINDIA.NS"
 ]
 
+# 30-week WMA weights with the 1/465 normalisation folded in, so the
+# per-call work is the dot product alone
+_WMA_WEIGHTS_NORM = np.arange(1, 31, dtype=np.float64)
+_WMA_WEIGHTS_NORM /= _WMA_WEIGHTS_NORM.sum()
+
 def compute_wma_and_slope(df):
-    df['WMA'] = df['Close'].rolling(window=30).apply(
-        lambda prices: np.dot(prices, np.arange(1, 31)) / np.arange(1, 31).sum(), raw=True
-    )
-    df['WMA_Slope'] = df['WMA'].diff(1)
+    # Zero-copy windows over the raw array, then one matrix-vector
+    # product; rolling.apply called back into Python once per window
+    close = df['Close'].to_numpy(dtype=np.float64)
+    wma = np.full(close.size, np.nan)
+    if close.size >= 30:
+        wma[29:] = sliding_window_view(close, 30) @ _WMA_WEIGHTS_NORM
+    df['WMA'] = wma
+    df['WMA_Slope'] = np.diff(wma, prepend=np.nan)
     df['EMA9'] = df['Close'].ewm(span=9, adjust=False).mean()
     return df
 
-def detect_weinstein_signals(ticker, start, end, capital=100000):
-    try:
-        df = yf.download(ticker, start=start, end=end, interval='1wk', auto_adjust=True, progress=False)
-
-        if df.empty or len(df) < 40:
-            return {
-                "Ticker": ticker,
-                "Trades": 0,
-                "Total Profit": 0,
-                "CAGR (%)": 0,
-                "Successful Trades": 0,
-                "Trade Details": []
-            }
+def _empty_result(ticker):
+    return {
+        "Ticker": ticker,
+        "Trades": 0,
+        "Total Profit": 0,
+        "CAGR (%)": 0,
+        "Successful Trades": 0,
+        "Trade Details": pd.DataFrame()
+    }
 
+def detect_weinstein_signals(ticker, df, capital=100000):
+    try:
+        print(f"Processing {ticker}...")
         df = compute_wma_and_slope(df)
 
         in_position = False
@@ -65,40 +80,61 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
         cash = capital
         shares = 0
         entry_date = None
-        trade_details = []
+        entry_i = -1
+        # SoA trade buffers: preallocated parallel arrays filled by
+        # index instead of a dict allocated per trade, sized to a safe
+        # upper bound (a round trip spans at least two bars)
+        max_trades = len(df) // 2 + 1
+        entry_idx = np.empty(max_trades, dtype=np.int64)
+        exit_idx = np.empty(max_trades, dtype=np.int64)
+        entry_prices = np.empty(max_trades, dtype=np.float64)
+        exit_prices = np.empty(max_trades, dtype=np.float64)
+        profits = np.empty(max_trades, dtype=np.float64)
+        # Alerts are buffered and sent as one message after the loop;
+        # a synchronous POST per signal would stall the backtest
+        alerts = []
 
         # For tracking breakdown candles
         breakdown_candle_low = None
 
+        # Pull the columns out as contiguous arrays once; per-row .iloc
+        # re-enters the pandas indexing machinery on every access
+        close_arr = df["Close"].to_numpy(dtype=np.float64)
+        wma_arr = df["WMA"].to_numpy(dtype=np.float64)
+        slope_arr = df["WMA_Slope"].to_numpy(dtype=np.float64)
+        ema9_arr = df["EMA9"].to_numpy(dtype=np.float64)
+        low_arr = df["Low"].to_numpy(dtype=np.float64)
+        # Dates as a raw datetime64 array too: df.index[i] does a label
+        # lookup per access, the array is plain pointer arithmetic
+        dates = df.index.to_numpy()
+        # One vectorised NaN sweep up front; the loop then tests a
+        # single precomputed boolean per bar
+        valid = ~(np.isnan(close_arr) | np.isnan(wma_arr)
+                  | np.isnan(slope_arr) | np.isnan(ema9_arr))
+
         for i in range(30, len(df)):
-            close = float(df["Close"].iloc[i])
-            wma = float(df["WMA"].iloc[i])
-            slope = float(df["WMA_Slope"].iloc[i])
-            ema9 = float(df["EMA9"].iloc[i])
-            low = float(df["Low"].iloc[i])  # Weekly low
+            close = close_arr[i]
+            wma = wma_arr[i]
+            slope = slope_arr[i]
+            ema9 = ema9_arr[i]
+            low = low_arr[i]  # Weekly low
 
-            if pd.isna(close) or pd.isna(wma) or pd.isna(slope) or pd.isna(ema9):
+            if not valid[i]:
                 continue
 
             # --- Buy condition ---
             if not in_position and close > ema9 and close > wma and slope > 0:
                 entry_price = close
-                shares = cash // entry_price
+                shares = math.floor(cash / entry_price)
                 if shares > 0:
                     cash -= shares * entry_price
                     in_position = True
-                    entry_date = df.index[i]
-                    # Send buy alert
-                    send_telegram_message(f"🟢 *BUY* {ticker} at {entry_price:.2f} on {entry_date.date()}")
+                    entry_i = i
+                    entry_date = pd.Timestamp(dates[i])
+                    # Queue buy alert
+                    alerts.append(f"🟢 *BUY* {ticker} at {entry_price:.2f} on {entry_date.date()}")
                     # Reset breakdown candle info
                     breakdown_candle_low = None
-                    current_trade = {
-                        "Entry Date": entry_date,
-                        "Entry Price": entry_price,
-                        "Exit Date": None,
-                        "Exit Price": None,
-                        "Profit": None
-                    }
 
             # --- Track breakdown candle ---
             if in_position and close < ema9:
@@ -110,36 +146,55 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
                 if close < breakdown_candle_low:
                     exit_price = close
                     cash += shares * exit_price
-                    trades += 1
                     profit = (exit_price - entry_price) * shares
+                    entry_idx[trades] = entry_i
+                    exit_idx[trades] = i
+                    entry_prices[trades] = entry_price
+                    exit_prices[trades] = exit_price
+                    profits[trades] = profit
+                    trades += 1
                     if profit > 0:
-                        # Send sell alert
-                        send_telegram_message(f"🔴 *SELL* {ticker} at {exit_price:.2f} on {df.index[i].date()}")
-                        current_trade["Exit Date"] = df.index[i]
-                        current_trade["Exit Price"] = exit_price
-                        current_trade["Profit"] = profit
-                        trade_details.append(current_trade)
+                        # Queue sell alert
+                        exit_date = pd.Timestamp(dates[i])
+                        alerts.append(f"🔴 *SELL* {ticker} at {exit_price:.2f} on {exit_date.date()}")
                     in_position = False
                     shares = 0
                     breakdown_candle_low = None
 
         # Final sell if still holding position
         if in_position:
-            final_price = float(df["Close"].iloc[-1])
+            final_price = float(close_arr[-1])
             cash += shares * final_price
-            trades += 1
             profit = (final_price - entry_price) * shares
+            entry_idx[trades] = entry_i
+            exit_idx[trades] = len(df) - 1
+            entry_prices[trades] = entry_price
+            exit_prices[trades] = final_price
+            profits[trades] = profit
+            trades += 1
             if profit > 0:
-                # Send final sell alert
-                send_telegram_message(f"🔴 *SELL* {ticker} at {final_price:.2f} on {df.index[-1].date()}")
-                current_trade["Exit Date"] = df.index[-1]
-                current_trade["Exit Price"] = final_price
-                current_trade["Profit"] = profit
-                trade_details.append(current_trade)
+                # Queue final sell alert
+                exit_date = pd.Timestamp(dates[-1])
+                alerts.append(f"🔴 *SELL* {ticker} at {final_price:.2f} on {exit_date.date()}")
+
+        # One POST for the whole ticker instead of one per signal
+        if alerts:
+            send_telegram_message("\n".join(alerts))
 
         total_profit = cash - capital
-        successful_trades = len([t for t in trade_details if t['Profit'] and t['Profit'] > 0])
-        years = (df.index[-1] - df.index[0]).days / 365.25
+        # Assemble the profitable-trade log once, columnar, from the
+        # SoA buffers; no per-trade dicts and no list-of-dicts inference
+        profitable = profits[:trades] > 0
+        trade_details = pd.DataFrame({
+            "Entry Date": dates[entry_idx[:trades][profitable]],
+            "Entry Price": entry_prices[:trades][profitable],
+            "Exit Date": dates[exit_idx[:trades][profitable]],
+            "Exit Price": exit_prices[:trades][profitable],
+            "Profit": profits[:trades][profitable],
+        })
+        successful_trades = int(profitable.sum())
+        # Plain datetime64 subtraction; no Timedelta object construction
+        years = (dates[-1] - dates[0]).astype('timedelta64[D]').astype(np.int64) / 365.25
         cagr = ((cash / capital) ** (1 / years) - 1) * 100
 
         return {
@@ -153,50 +208,71 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
 
     except Exception as e:
         print(f"Error processing {ticker}: {e}")
-        return {
-            "Ticker": ticker,
-            "Trades": 0,
-            "Total Profit": 0,
-            "CAGR (%)": 0,
-            "Successful Trades": 0,
-            "Trade Details": []
-        }
+        return _empty_result(ticker)
 
 # --- Run from one month ago to today ---
-start_date_dt = datetime(2010, 1, 1)
-# Format it as a string
-start_date = start_date_dt.strftime("%Y-%m-%d")
-end_date_dt = datetime.today()
-end_date = end_date_dt.strftime("%Y-%m-%d")
-initial_capital = 100000
-
-results = []
-for ticker in nifty50_tickers:
-    print(f"Processing {ticker}...")
-    result = detect_weinstein_signals(ticker, start=start_date, end=end_date, capital=initial_capital)
-    results.append(result)
-
-# Convert results to DataFrame
-df_result = pd.DataFrame(results)
-df_result = df_result.sort_values(by="CAGR (%)", ascending=False)
-
-# Print summary
-print(df_result[['Ticker', 'Trades', 'Total Profit', 'CAGR (%)', 'Successful Trades']])
-
-# Save detailed trade info for the top stock
-top_stock = df_result.iloc[0]['Ticker']
-top_stock_details = next(r for r in results if r['Ticker'] == top_stock)
-trade_details_df = pd.DataFrame(top_stock_details['Trade Details'])
-trade_details_df.to_csv(f"{top_stock}_profitable_trade_details.csv", index=False)
-
-# Portfolio summary
-total_profit = df_result["Total Profit"].sum()
-final_value = initial_capital + total_profit
-years_total = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.25
-portfolio_cagr = ((final_value / initial_capital) ** (1 / years_total) - 1) * 100
-
-print(f"\nTotal Portfolio Profit: ₹{round(total_profit, 2)}")
-print(f"Portfolio CAGR: {round(portfolio_cagr, 2)}%")
+# The driver sits under a main guard so worker processes can import
+# this module without re-running the download and pool creation
+# under the spawn/forkserver start methods
+if __name__ == "__main__":
+    start_date_dt = datetime(2010, 1, 1)
+    # Format it as a string
+    start_date = start_date_dt.strftime("%Y-%m-%d")
+    end_date_dt = datetime.today()
+    end_date = end_date_dt.strftime("%Y-%m-%d")
+    initial_capital = 100000
+
+    # One batched request for all tickers; yfinance fans the chunks out over
+    # its own thread pool and reuses the connection instead of opening a
+    # fresh HTTP chain per ticker
+    bulk = yf.download(nifty50_tickers, start=start_date, end=end_date, interval='1wk',
+                       group_by='ticker', auto_adjust=True, threads=True, progress=False)
+
+    # Viability is decided here, not in the workers: tickers without enough
+    # history (delisted names come back empty) get their zero rows directly
+    # and never occupy a pool slot
+    tasks = []
+    results = []
+    for ticker in nifty50_tickers:
+        try:
+            df = bulk[ticker].dropna(how='all')
+        except KeyError:
+            df = pd.DataFrame()
+        if len(df) >= 40:
+            tasks.append((ticker, df, initial_capital))
+        else:
+            print(f"Skipping {ticker}: not enough data")
+            results.append(_empty_result(ticker))
+
+    # With the data already local, the per-ticker backtests are CPU-bound;
+    # worker processes sidestep the GIL and scale with cores. An empty task
+    # list (say the batched download came back with nothing) skips the pool
+    # and degrades to the zero-row summary
+    if tasks:
+        with mp.Pool(min(mp.cpu_count(), len(tasks))) as pool:
+            results.extend(pool.starmap(detect_weinstein_signals, tasks))
+
+    # Convert results to DataFrame
+    df_result = pd.DataFrame(results)
+    df_result = df_result.sort_values(by="CAGR (%)", ascending=False)
+
+    # Print summary
+    print(df_result[['Ticker', 'Trades', 'Total Profit', 'CAGR (%)', 'Successful Trades']])
+
+    # Save detailed trade info for the top stock
+    top_stock = df_result.iloc[0]['Ticker']
+    top_stock_details = next(r for r in results if r['Ticker'] == top_stock)
+    trade_details_df = top_stock_details['Trade Details']
+    trade_details_df.to_csv(f"{top_stock}_profitable_trade_details.csv", index=False)
+
+    # Portfolio summary
+    total_profit = df_result["Total Profit"].sum()
+    final_value = initial_capital + total_profit
+    years_total = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.25
+    portfolio_cagr = ((final_value / initial_capital) ** (1 / years_total) - 1) * 100
+
+    print(f"\nTotal Portfolio Profit: ₹{round(total_profit, 2)}")
+    print(f"Portfolio CAGR: {round(portfolio_cagr, 2)}%")
 
 """
 Processing RELIANCE.NS...
@@ -0,0 +1,188 @@
+"""Shared plumbing for the alert and backtest scripts.
+
+The scripts previously each re-defined the Telegram session, the parquet
+cache helpers and the cache-directory setup; importing this module once
+covers all of it (and keeps heavyweight imports like yfinance out of the
+shared path).
+"""
+import glob
+import logging
+import os
+import time
+
+import pandas as pd
+import requests
+from urllib3.util.retry import Retry
+
+# Default Telegram credentials come from the environment; scripts with
+# their own credentials pass them to send_telegram_message explicitly.
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+
+# Cache directory
+CACHE_DIR = 'cache'
+if not os.path.exists(CACHE_DIR):
+    os.makedirs(CACHE_DIR)
+
+# Cached daily bars are considered fresh for one day
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# Yahoo's quote endpoint accepts roughly this many symbols per request
+BATCH_SIZE = 20
+
+# Optional cross-run HTTP cache for yfinance: with requests_cache
+# installed, repeat fetches within the hour are served from sqlite
+# instead of a fresh Yahoo round-trip. yfinance accepts session=None.
+try:
+    import requests_cache
+    yf_session = requests_cache.CachedSession('yf_cache', backend='sqlite',
+                                              expire_after=3600)
+except ImportError:
+    yf_session = None
+
+# One pooled HTTPS session so repeated alerts reuse the TLS connection
+_telegram_session = requests.Session()
+_telegram_session.mount('https://', requests.adapters.HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3)))
+
+
+# Default-credential endpoint and payload, built once at import; the
+# common path only swaps in the message text per call. The scripts send
+# their digests serially after the worker pools, so reusing one dict is
+# safe here.
+_TG_URL = f'https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage'
+_TG_PAYLOAD = {'chat_id': TELEGRAM_CHAT_ID, 'text': ''}
+
+
+def send_telegram_message(message, token=None, chat_id=None):
+    if token is None and chat_id is None:
+        url = _TG_URL
+        payload = _TG_PAYLOAD
+        payload['text'] = message
+    else:
+        url = f'https://api.telegram.org/bot{token or TELEGRAM_BOT_TOKEN}/sendMessage'
+        payload = {'chat_id': chat_id or TELEGRAM_CHAT_ID, 'text': message}
+    try:
+        response = _telegram_session.post(url, data=payload, timeout=5)
+        response.raise_for_status()
+        logging.info("Telegram message sent successfully.")
+        return True
+    except Exception as e:
+        logging.error(f"Error sending Telegram message: {e}")
+        return False
+
+
+def clear_cache():
+    cache_files = glob.glob(os.path.join(CACHE_DIR, '*.parquet'))
+    for file_path in cache_files:
+        try:
+            os.remove(file_path)
+            logging.info(f"Deleted cache file: {file_path}")
+        except Exception as e:
+            logging.warning(f"Failed to delete {file_path}: {e}")
+
+
+def load_cached_data(symbol, ttl=None):
+    """Load a symbol's cached frame; with ttl set, stale files are a miss."""
+    filepath = os.path.join(CACHE_DIR, f"{symbol}.parquet")
+    if os.path.exists(filepath):
+        if ttl is not None and time.time() - os.path.getmtime(filepath) > ttl:
+            logging.debug(f"Cache for {symbol} is stale; treating as a miss")
+            return None
+        try:
+            # Writes are atomic (tmp + rename), so a cache file is either
+            # absent or complete and needs no per-row index revalidation
+            return pd.read_parquet(filepath)
+        except Exception as e:
+            logging.warning(f"Failed to load cache for {symbol}: {e}")
+    else:
+        logging.debug(f"No cache found for {symbol}")
+    return None
+
+
+def save_cache_data(symbol, df):
+    filepath = os.path.join(CACHE_DIR, f"{symbol}.parquet")
+    # Write to a temp file and rename so a killed process can never leave
+    # a truncated parquet behind for the next load to half-parse
+    df.to_parquet(filepath + '.tmp', compression='zstd')
+    os.replace(filepath + '.tmp', filepath)
+    logging.info(f"Saved cache for {symbol} with {len(df)} rows.")
+
+
+def load_or_download_weekly(ticker, start, end):
+    """Weekly OHLC for one ticker, served from the parquet cache when fresh.
+
+    The backtests re-request the same 2010-to-today weekly history on
+    every run; a cache file younger than the daily TTL answers from disk
+    instead. The key includes the start date so backtests over different
+    windows don't share files, and the end date only ever moves with
+    today, which the mtime check already covers.
+    """
+    df = load_cached_data(f"{ticker}_{start}_1wk", ttl=CACHE_TTL_SECONDS)
+    if df is not None and not df.empty:
+        return df
+    import yfinance as yf
+
+    df = yf.download(ticker, start=start, end=end, interval='1wk',
+                     auto_adjust=True, progress=False, session=yf_session)
+    if not df.empty:
+        save_cache_data(f"{ticker}_{start}_1wk", df)
+    return df
+
+
+def load_or_download_daily(ticker, start, end):
+    """Daily OHLC for one ticker, same cache discipline as the weekly path."""
+    df = load_cached_data(f"{ticker}_{start}_1d", ttl=CACHE_TTL_SECONDS)
+    if df is not None and not df.empty:
+        return df
+    import yfinance as yf
+
+    df = yf.download(ticker, start=start, end=end, interval='1d',
+                     auto_adjust=True, progress=False, session=yf_session)
+    if not df.empty:
+        save_cache_data(f"{ticker}_{start}_1d", df)
+    return df
+
+
+def fetch_data_for_symbol(symbol):
+    """Resolve one symbol's daily frame from cache, topping up stale tails.
+
+    yfinance is imported lazily so scripts that only need the Telegram or
+    cache helpers don't pay its import cost.
+    """
+    import yfinance as yf
+
+    df_cached = load_cached_data(symbol)
+    if df_cached is not None and not df_cached.empty:
+        filepath = os.path.join(CACHE_DIR, f"{symbol}.parquet")
+        cache_age = time.time() - os.path.getmtime(filepath)
+        if cache_age < CACHE_TTL_SECONDS:
+            logging.info(f"Using cached data for {symbol} with {len(df_cached)} rows.")
+            return df_cached
+        # Stale cache: fetch only the bars after the last cached date
+        last_cached_date = df_cached.index[-1]
+        try:
+            df_tail = yf.download(symbol, start=last_cached_date + pd.Timedelta(days=1),
+                                  interval='1d', auto_adjust=True, session=yf_session)
+            if not df_tail.empty:
+                df_cached = pd.concat([df_cached, df_tail])
+                df_cached = df_cached[~df_cached.index.duplicated(keep='last')]
+                logging.info(f"Appended {len(df_tail)} new rows for {symbol}")
+            save_cache_data(symbol, df_cached)
+            return df_cached
+        except Exception as e:
+            logging.error(f"Error updating cached data for {symbol}: {e}")
+            return df_cached
+    try:
+        df_new = yf.download(symbol, period='10d', interval='1d', auto_adjust=True,
+                             session=yf_session)
+        if not df_new.empty:
+            logging.info(f"Fetched {len(df_new)} rows for {symbol}")
+            save_cache_data(symbol, df_new)
+        else:
+            logging.warning(f"No data received for {symbol}")
+        return df_new
+    except Exception as e:
+        logging.error(f"Error fetching data for {symbol}: {e}")
+        return pd.DataFrame()
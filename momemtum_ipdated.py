@@ -1,26 +1,13 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import requests
-import os
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-# Telegram token and chat id
-TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')  # Or get from env
-CHAT_ID = os.getenv('CHAT_ID')
+from momentum_core import (NIFTY50_TICKERS, prepare_frame, run_backtest,
+                           send_telegram_message)
+from ema_common import load_or_download_daily
 
-# Initialize trade log list
-trade_log = []
-
-def send_telegram_message(message):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {'chat_id': CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
-    try:
-        requests.post(url, data=payload)
-    except Exception as e:
-        print(f"Failed to send message: {e}")
-
-def log_trade(ticker, action, price, date, shares=0):
+def log_trade(trade_log, ticker, action, price, date, shares=0):
     # action: "BUY" or "SELL"
     trade = {
         'Ticker': ticker,
@@ -31,122 +18,68 @@ def log_trade(ticker, action, price, date, shares=0):
     }
     trade_log.append(trade)
 
-def compute_indicators(df):
-    df['200EMA'] = df['Close'].ewm(span=200, adjust=False).mean()
-    df['50EMA'] = df['Close'].ewm(span=50, adjust=False).mean()
-    df['20EMA'] = df['Close'].ewm(span=20, adjust=False).mean()
-    df['9EMA'] = df['Close'].ewm(span=9, adjust=False).mean()
-    return df
-
-def detect_signals(ticker, start, end, capital=100000):
-    trades_this_stock = 0
-    try:
-        df = yf.download(ticker, start=start, end=end, interval='1d', auto_adjust=True, progress=False)
-        if df.empty or len(df) < 200:
-            print(f"Data insufficient for {ticker}")
-            return {"Ticker": ticker, "Trades": 0, "Total Profit": 0}
-
-        df = compute_indicators(df)
-
-        in_position = False
-        cash = capital
-        shares = 0
-        entry_price = 0
-        total_trades = 0
-        breakdown_candle_low = None
-
-        for i in range(200, len(df)):
-            date_str = df.index[i].date().isoformat()
-            close = float(df['Close'].iloc[i])
-            dma_200 = float(df['200EMA'].iloc[i])
-            dma_50 = float(df['50EMA'].iloc[i])
-            dma_20 = float(df['20EMA'].iloc[i])
-            dma_9 = float(df['9EMA'].iloc[i])
-            ema_9 = float(df['9EMA'].iloc[i])
-            low = float(df['Low'].iloc[i])
-
-            # --- BUY logic ---
-            if (not in_position and 
-                not pd.isna(dma_200) and 
-                not pd.isna(dma_50) and 
-                not pd.isna(dma_20) and 
-                not pd.isna(dma_9) and 
-                not pd.isna(close)):
-                if (close > dma_200 and close > dma_50 and close > dma_20 and close > dma_9):
-                    entry_price = close
-                    shares = cash // entry_price
-                    if shares > 0:
-                        cash -= shares * entry_price
-                        in_position = True
-                        send_telegram_message(f"🟢 BUY {ticker} at ${entry_price:.2f} on {date_str}")
-                        log_trade(ticker, 'BUY', entry_price, date_str, shares)
-
-            # --- Track breakdown candle ---
-            if in_position and not pd.isna(ema_9):
-                if close < ema_9:
-                    if breakdown_candle_low is None:
-                        breakdown_candle_low = low
-
-            # --- SELL logic ---
-            if in_position and breakdown_candle_low is not None:
-                if not pd.isna(close) and not pd.isna(breakdown_candle_low):
-                    if close < breakdown_candle_low:
-                        exit_price = close
-                        cash += shares * exit_price
-                        total_trades += 1
-                        profit = (exit_price - entry_price) * shares
-                        if profit > 0:
-                            send_telegram_message(f"🔴 SELL {ticker} at ${exit_price:.2f} on {date_str}")
-                        log_trade(ticker, 'SELL', exit_price, date_str, shares)
-                        in_position = False
-                        shares = 0
-                        breakdown_candle_low = None
-
-        # Close position at end
-        if in_position:
-            final_price = float(df['Close'].iloc[-1])
-            final_date = df.index[-1].date().isoformat()
-            if not pd.isna(final_price):
-                cash += shares * final_price
-                total_trades += 1
-                profit = (final_price - entry_price) * shares
-                send_telegram_message(f"🔴 SELL (end) {ticker} at ${final_price:.2f} on {final_date}")
-                log_trade(ticker, 'SELL', final_price, final_date, shares)
-                in_position = False
-
-        total_profit = cash - capital
-        return {"Ticker": ticker, "Trades": total_trades, "Total Profit": round(total_profit, 2)}
-
-    except Exception as e:
-        print(f"Error processing {ticker}: {e}")
-        return {"Ticker": ticker, "Trades": 0, "Total Profit": 0}
-
 # --- Main ---
 start_date = "2010-01-01"
 end_date = datetime.today().strftime("%Y-%m-%d")
 initial_capital = 100000
 
-# List of stocks
-# Nifty 50 stock list
-nifty50_tickers = [
-    "RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS",
-    "HINDUNILVR.NS", "KOTAKBANK.NS", "SBIN.NS", "AXISBANK.NS", "BAJFINANCE.NS",
-    "ITC.NS", "BHARTIARTL.NS", "HCLTECH.NS", "ASIANPAINT.NS", "LT.NS",
-    "MARUTI.NS", "HDFCLIFE.NS", "WIPRO.NS", "ULTRACEMCO.NS", "ONGC.NS",
-    "TITAN.NS", "SUNPHARMA.NS", "NESTLEIND.NS", "POWERGRID.NS", "BAJAJFINSV.NS",
-    "TATASTEEL.NS", "ADANIGREEN.NS", "NTPC.NS", "JSWSTEEL.NS", "DIVISLAB.NS",
-    "DRREDDY.NS", "HEROMOTOCO.NS", "BAJAJ-AUTO.NS", "BRITANNIA.NS", "CIPLA.NS",
-    "INDUSINDBK.NS", "EICHERMOT.NS", "TECHM.NS", "TATAMOTORS.NS", "GRASIM.NS",
-    "BPCL.NS", "ADANIPORTS.NS", "COALINDIA.NS", "HINDALCO.NS", "SBILIFE.NS",
-    "SHREECEM.NS", "UPL.NS", "VEDL.NS", "M&M.NS", "IOC.NS"
-]
+nifty50_tickers = NIFTY50_TICKERS
 
-# Run the backtest
-results = []
-for ticker in nifty50_tickers:
+# Downloads are I/O-bound, so a thread pool overlaps the network waits;
+# the parquet cache answers warm re-runs from disk without touching Yahoo
+def fetch_ticker(ticker):
     print(f"Processing {ticker}...")
-    result = detect_signals(ticker, start=start_date, end=end_date, capital=initial_capital)
-    results.append(result)
+    try:
+        return load_or_download_daily(ticker, start_date, end_date)
+    except Exception as e:
+        print(f"Error processing {ticker}: {e}")
+        return pd.DataFrame()
+
+with ThreadPoolExecutor(max_workers=8) as pool:
+    raw_frames = list(pool.map(fetch_ticker, nifty50_tickers))
+
+summaries = {}
+good_tickers = []
+frames = []
+for ticker, df in zip(nifty50_tickers, raw_frames):
+    if df.empty or len(df) < 200:
+        print(f"Data insufficient for {ticker}")
+        summaries[ticker] = {"Ticker": ticker, "Trades": 0, "Total Profit": 0}
+        continue
+    frames.append(prepare_frame(df))
+    good_tickers.append(ticker)
+
+records = run_backtest(good_tickers, frames, initial_capital)
+
+# Replay the recorded trades serially for this script's side effects:
+# every entry and exit is logged, SELL alerts only fire on profit, and a
+# position closed out on the last bar is alerted as "SELL (end)". One
+# POST carries the whole ticker's alerts
+trade_log = []
+for t, ticker in enumerate(good_tickers):
+    cash, trades, entry_idx, exit_idx, entry_px, exit_px, trade_shares, forced = records[ticker]
+    date_strs = frames[t].index.strftime('%Y-%m-%d').to_numpy()
+    alerts = []
+    for k in range(trades):
+        shares = int(trade_shares[k])
+        entry_price = float(entry_px[k])
+        exit_price = float(exit_px[k])
+        buy_date = date_strs[entry_idx[k]]
+        sell_date = date_strs[exit_idx[k]]
+        alerts.append(f"🟢 BUY {ticker} at ${entry_price:.2f} on {buy_date}")
+        log_trade(trade_log, ticker, 'BUY', entry_price, buy_date, shares)
+        profit = (exit_price - entry_price) * shares
+        if forced and k == trades - 1:
+            alerts.append(f"🔴 SELL (end) {ticker} at ${exit_price:.2f} on {sell_date}")
+        elif profit > 0:
+            alerts.append(f"🔴 SELL {ticker} at ${exit_price:.2f} on {sell_date}")
+        log_trade(trade_log, ticker, 'SELL', exit_price, sell_date, shares)
+    if alerts:
+        send_telegram_message("\n".join(alerts))
+    summaries[ticker] = {"Ticker": ticker, "Trades": trades,
+                         "Total Profit": round(cash - initial_capital, 2)}
+
+results = [summaries[ticker] for ticker in nifty50_tickers]
 
 # Save trade log to CSV
 trades_df = pd.DataFrame(trade_log)
@@ -156,7 +89,10 @@ trades_df.to_csv("trade_log.csv", index=False)
 df_results = pd.DataFrame(results)
 print(df_results[['Ticker', 'Trades', 'Total Profit']])
 
-total_profit = df_results["Total Profit"].sum()
+# Summed straight off the per-ticker array; the DataFrame above exists
+# only for display
+profit_final = np.array([summaries[t]["Total Profit"] for t in nifty50_tickers])
+total_profit = round(float(profit_final.sum()), 2)
 final_value = initial_capital + total_profit
 years_total = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.25
 if years_total > 0:
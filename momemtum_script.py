@@ -1,143 +1,70 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import requests
-import os
 from datetime import datetime
 
-# Read Telegram credentials from environment variables
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
-CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-
-def send_telegram_message(message):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {'chat_id': CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
-    try:
-        requests.post(url, data=payload)
-    except Exception as e:
-        print(f"Failed to send message: {e}")
-
-def compute_indicators(df):
-    """
-    Compute EMAs for moving averages.
-    """
-    df['200EMA'] = df['Close'].ewm(span=200, adjust=False).mean()
-    df['50EMA'] = df['Close'].ewm(span=50, adjust=False).mean()
-    df['20EMA'] = df['Close'].ewm(span=20, adjust=False).mean()
-    df['9EMA'] = df['Close'].ewm(span=9, adjust=False).mean()
-    return df
-
-def detect_signals(ticker, start, end, capital=100000):
-    try:
-        df = yf.download(ticker, start=start, end=end, interval='1d', auto_adjust=True, progress=False)
-        if df.empty or len(df) < 200:
-            print(f"Data insufficient for {ticker}")
-            return {"Ticker": ticker, "Trades": 0, "Total Profit": 0}
-
-        df = compute_indicators(df)
-
-        in_position = False
-        cash = capital
-        shares = 0
-        entry_price = 0
-        trades = 0
-        breakdown_candle_low = None
-
-        for i in range(200, len(df)):
-            # Extract scalars with float()
-            close = float(df['Close'].iloc[i])
-            dma_200 = float(df['200EMA'].iloc[i])
-            dma_50 = float(df['50EMA'].iloc[i])
-            dma_20 = float(df['20EMA'].iloc[i])
-            dma_9 = float(df['9EMA'].iloc[i])
-            ema_9 = float(df['9EMA'].iloc[i])
-            low = float(df['Low'].iloc[i])
-
-            # --- BUY logic ---
-            if (not in_position and 
-                not pd.isna(dma_200) and 
-                not pd.isna(dma_50) and 
-                not pd.isna(dma_20) and 
-                not pd.isna(dma_9) and 
-                not pd.isna(close)):
-                if (close > dma_200 and close > dma_50 and close > dma_20 and close > dma_9):
-                    # Buy signal
-                    entry_price = close
-                    shares = cash // entry_price
-                    if shares > 0:
-                        cash -= shares * entry_price
-                        in_position = True
-                        send_telegram_message(f"🟢 *BUY* {ticker} at {entry_price:.2f} on {df.index[i].date()}")
-
-            # --- Track breakdown candle ---
-            if in_position and not pd.isna(ema_9):
-                if close < ema_9:
-                    if breakdown_candle_low is None:
-                        breakdown_candle_low = low
-                        # print(f"Breakdown candle low set at {breakdown_candle_low}")
-
-            # --- SELL logic ---
-            if in_position and breakdown_candle_low is not None:
-                if not pd.isna(close) and not pd.isna(breakdown_candle_low):
-                    if close < breakdown_candle_low:
-                        # Sell
-                        exit_price = close
-                        cash += shares * exit_price
-                        trades += 1
-                        profit = (exit_price - entry_price) * shares
-                        if profit > 0:
-                            send_telegram_message(f"🔴 *SELL* {ticker} at {exit_price:.2f} on {df.index[i].date()}")
-                        in_position = False
-                        shares = 0
-                        breakdown_candle_low = None
-
-        # Close position at end if still open
-        if in_position:
-            final_price = float(df['Close'].iloc[-1])
-            if not pd.isna(final_price):
-                cash += shares * final_price
-                trades += 1
-                in_position = False
-
-        total_profit = cash - capital
-        return {"Ticker": ticker, "Trades": trades, "Total Profit": round(total_profit, 2)}
-
-    except Exception as e:
-        print(f"Error processing {ticker}: {e}")
-        return {"Ticker": ticker, "Trades": 0, "Total Profit": 0}
+from momentum_core import (NIFTY50_TICKERS, prepare_frame, run_backtest,
+                           send_telegram_message)
 
 # --- Main ---
 start_date = "2010-01-01"
 end_date = datetime.today().strftime("%Y-%m-%d")
 initial_capital = 100000
 
-# Nifty 50 stock list
-nifty50_tickers = [
-    "RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS",
-    "HINDUNILVR.NS", "KOTAKBANK.NS", "SBIN.NS", "AXISBANK.NS", "BAJFINANCE.NS",
-    "ITC.NS", "BHARTIARTL.NS", "HCLTECH.NS", "ASIANPAINT.NS", "LT.NS",
-    "MARUTI.NS", "HDFCLIFE.NS", "WIPRO.NS", "ULTRACEMCO.NS", "ONGC.NS",
-    "TITAN.NS", "SUNPHARMA.NS", "NESTLEIND.NS", "POWERGRID.NS", "BAJAJFINSV.NS",
-    "TATASTEEL.NS", "ADANIGREEN.NS", "NTPC.NS", "JSWSTEEL.NS", "DIVISLAB.NS",
-    "DRREDDY.NS", "HEROMOTOCO.NS", "BAJAJ-AUTO.NS", "BRITANNIA.NS", "CIPLA.NS",
-    "INDUSINDBK.NS", "EICHERMOT.NS", "TECHM.NS", "TATAMOTORS.NS", "GRASIM.NS",
-    "BPCL.NS", "ADANIPORTS.NS", "COALINDIA.NS", "HINDALCO.NS", "SBILIFE.NS",
-    "SHREECEM.NS", "UPL.NS", "VEDL.NS", "M&M.NS", "IOC.NS"
-]
+nifty50_tickers = NIFTY50_TICKERS
 
-# Run the backtest
-results = []
+# One bulk request instead of 50 sequential downloads; yfinance returns
+# a MultiIndex frame keyed by ticker
+data = yf.download(nifty50_tickers, start=start_date, end=end_date, interval='1d',
+                   group_by='ticker', threads=True, auto_adjust=True, progress=False)
+
+# Prepare per-ticker frames; short or missing histories are settled here
+# so the kernel only sees runnable rows
+summaries = {}
+good_tickers = []
+frames = []
 for ticker in nifty50_tickers:
     print(f"Processing {ticker}...")
-    result = detect_signals(ticker, start=start_date, end=end_date, capital=initial_capital)
-    results.append(result)
+    try:
+        df = data[ticker].dropna(how='all')
+    except KeyError:
+        df = pd.DataFrame()
+    if df.empty or len(df) < 200:
+        print(f"Data insufficient for {ticker}")
+        summaries[ticker] = {"Ticker": ticker, "Trades": 0, "Total Profit": 0}
+        continue
+    frames.append(prepare_frame(df))
+    good_tickers.append(ticker)
+
+records = run_backtest(good_tickers, frames, initial_capital)
+
+# Telegram replay stays serial, after the parallel section: a BUY alert
+# per entry, SELL alerts only for profitable exits, and none for a
+# position force-closed on the last bar
+for t, ticker in enumerate(good_tickers):
+    cash, trades, entry_idx, exit_idx, entry_px, exit_px, trade_shares, forced = records[ticker]
+    index = frames[t].index
+    msgs = []
+    for k in range(trades):
+        msgs.append(f"🟢 *BUY* {ticker} at {entry_px[k]:.2f} on {index[entry_idx[k]].date()}")
+        profit = (exit_px[k] - entry_px[k]) * trade_shares[k]
+        if profit > 0 and not (forced and k == trades - 1):
+            msgs.append(f"🔴 *SELL* {ticker} at {exit_px[k]:.2f} on {index[exit_idx[k]].date()}")
+    if msgs:
+        send_telegram_message("\n".join(msgs))
+    summaries[ticker] = {"Ticker": ticker, "Trades": trades,
+                         "Total Profit": round(cash - initial_capital, 2)}
+
+results = [summaries[ticker] for ticker in nifty50_tickers]
 
 # Results DataFrame
 df_results = pd.DataFrame(results)
 print(df_results[['Ticker', 'Trades', 'Total Profit']])
 
-# Portfolio summary
-total_profit = df_results["Total Profit"].sum()
+# Portfolio summary: summed straight off the per-ticker array; the
+# DataFrame above exists only for display
+profit_final = np.array([summaries[t]["Total Profit"] for t in nifty50_tickers])
+total_profit = round(float(profit_final.sum()), 2)
 final_value = initial_capital + total_profit
 years_total = (pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.25
 if years_total > 0:
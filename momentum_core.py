@@ -0,0 +1,112 @@
+"""Shared core for the two momentum backtest scripts.
+
+momemtum_script.py and momemtum_ipdated.py were near-identical copies,
+so every optimization had to land twice and each module warmed its own
+numba specializations. The ticker list, Telegram plumbing, indicator
+computation and the stacked parallel backtest live here once; the entry
+scripts only differ in how they fetch data and format their alerts and
+trade logs, and both now share the same on-disk numba cache.
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from _njit import four_emas, run_momentum_all
+
+# Accept either script's historical environment variable names
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_TOKEN") or os.getenv("TELEGRAM_BOT_TOKEN")
+CHAT_ID = os.getenv("TELEGRAM_CHAT_ID") or os.getenv("CHAT_ID")
+
+# Nifty 50 stock list
+NIFTY50_TICKERS = [
+    "RELIANCE.NS", "TCS.NS", "INFY.NS", "HDFCBANK.NS", "ICICIBANK.NS",
+    "HINDUNILVR.NS", "KOTAKBANK.NS", "SBIN.NS", "AXISBANK.NS", "BAJFINANCE.NS",
+    "ITC.NS", "BHARTIARTL.NS", "HCLTECH.NS", "ASIANPAINT.NS", "LT.NS",
+    "MARUTI.NS", "HDFCLIFE.NS", "WIPRO.NS", "ULTRACEMCO.NS", "ONGC.NS",
+    "TITAN.NS", "SUNPHARMA.NS", "NESTLEIND.NS", "POWERGRID.NS", "BAJAJFINSV.NS",
+    "TATASTEEL.NS", "ADANIGREEN.NS", "NTPC.NS", "JSWSTEEL.NS", "DIVISLAB.NS",
+    "DRREDDY.NS", "HEROMOTOCO.NS", "BAJAJ-AUTO.NS", "BRITANNIA.NS", "CIPLA.NS",
+    "INDUSINDBK.NS", "EICHERMOT.NS", "TECHM.NS", "TATAMOTORS.NS", "GRASIM.NS",
+    "BPCL.NS", "ADANIPORTS.NS", "COALINDIA.NS", "HINDALCO.NS", "SBILIFE.NS",
+    "SHREECEM.NS", "UPL.NS", "VEDL.NS", "M&M.NS", "IOC.NS"
+]
+
+# One pooled session so repeated alerts reuse the TCP/TLS connection;
+# a small retry budget with backoff rides out transient Telegram errors
+# instead of silently dropping the alert
+_SESSION = requests.Session()
+_SESSION.headers.update({"Connection": "keep-alive"})
+_SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1,
+                                       max_retries=Retry(total=3, backoff_factor=0.3)))
+
+
+def send_telegram_message(message):
+    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    payload = {'chat_id': CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
+    try:
+        _SESSION.post(url, data=payload, timeout=5)
+    except Exception as e:
+        print(f"Failed to send message: {e}")
+
+
+def compute_indicators(close):
+    """Four EMAs over one close array, fused into a single kernel pass."""
+    return four_emas(close, 2.0 / 201.0, 2.0 / 51.0, 2.0 / 21.0, 2.0 / 10.0)
+
+
+# Index for date formatting plus the six arrays the kernel consumes
+PreparedFrame = namedtuple('PreparedFrame',
+                           ['index', 'close', 'low',
+                            'ema200', 'ema50', 'ema20', 'ema9'])
+
+
+def prepare_frame(df):
+    """Extract the index and Close/Low arrays and attach the four EMAs.
+
+    Indicators stay as plain ndarrays rather than being written back as
+    DataFrame columns: each column assignment costs a Series build, an
+    index alignment and a block insert, and the kernel only wants the
+    arrays anyway. The DataFrame is used purely as the source of
+    Close, Low and the date index.
+    """
+    close = df['Close'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    ema200, ema50, ema20, ema9 = compute_indicators(close)
+    return PreparedFrame(df.index, close, low, ema200, ema50, ema20, ema9)
+
+
+def run_backtest(tickers, frames, capital):
+    """Backtest every prepared frame in one parallel kernel call.
+
+    The frames are stacked into NaN-padded float32 matrices and handed
+    to run_momentum_all, whose prange loop spreads the independent rows
+    across physical cores. Returns {ticker: (cash, n_trades, entry_idx,
+    exit_idx, entry_px, exit_px, trade_shares, forced_close)} with only
+    the first n_trades entries of each array meaningful; callers replay
+    the records with their own alert and log formats.
+    """
+    if not frames:
+        return {}
+    lengths = np.array([frame.close.size for frame in frames], dtype=np.int64)
+    max_len = int(lengths.max())
+    stacks = [np.full((len(frames), max_len), np.nan, dtype=np.float32)
+              for _ in range(6)]
+    for t, frame in enumerate(frames):
+        # frame[1:] are the six arrays; assignment into the float32
+        # stacks downcasts in place
+        for stack, arr in zip(stacks, frame[1:]):
+            stack[t, :lengths[t]] = arr
+
+    cash_out, trades_out, entry_idx, exit_idx, entry_px, exit_px, trade_shares, forced = run_momentum_all(
+        *stacks, lengths, float(capital))
+
+    return {
+        ticker: (float(cash_out[t]), int(trades_out[t]), entry_idx[t],
+                 exit_idx[t], entry_px[t], exit_px[t], trade_shares[t],
+                 bool(forced[t]))
+        for t, ticker in enumerate(tickers)
+    }
@@ -117,25 +117,62 @@ Copy message
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import requests
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import requests
+from urllib3.util.retry import Retry
 import os
 
+from _njit import ewma9, wma30
+
 # --- Telegram setup ---
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
-def send_telegram_message(message):
+# One pooled HTTPS session so repeated alerts reuse the TLS connection
+_telegram_session = requests.Session()
+_telegram_session.mount('https://', requests.adapters.HTTPAdapter(
+    pool_connections=4, pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.3)))
+
+# Fire-and-forget alerting: signal loops queue the message and keep
+# scanning while one daemon consumer drains the queue over the pooled
+# session, so no backtest thread ever blocks on a Telegram round-trip
+_telegram_queue = queue.Queue()
+
+
+def _telegram_consumer():
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        'chat_id': CHAT_ID,
-        'text': message,
-        'parse_mode': 'Markdown'
-    }
-    try:
-        requests.post(url, data=payload)
-    except Exception as e:
-        print(f"Failed to send message: {e}")
+    while True:
+        message = _telegram_queue.get()
+        payload = {
+            'chat_id': CHAT_ID,
+            'text': message,
+            'parse_mode': 'Markdown'
+        }
+        try:
+            _telegram_session.post(url, data=payload, timeout=5)
+        except Exception as e:
+            print(f"Failed to send message: {e}")
+        _telegram_queue.task_done()
+
+
+threading.Thread(target=_telegram_consumer, daemon=True).start()
+
+
+def send_telegram_message(message):
+    _telegram_queue.put(message)
+
+
+def flush_telegram_messages():
+    """Block until every queued alert has been posted.
+
+    The consumer runs on a daemon thread, so messages still in flight
+    when the interpreter exits would otherwise be dropped.
+    """
+    _telegram_queue.join()
 
 # --- Nifty 50 list ---
 nifty50_tickers = [
@@ -152,14 +189,16 @@ nifty50_tickers = [
 ]
 
 def compute_wma_and_slope(df):
-    df['WMA'] = df['Close'].rolling(window=30).apply(
-        lambda prices: np.dot(prices, np.arange(1, 31)) / np.arange(1, 31).sum(), raw=True
-    )
+    # wma30 is specialised for window=30 and compiled once at import when
+    # numba is available; otherwise it falls back to a vectorised dot product
+    close = df['Close'].to_numpy(dtype=np.float64)
+    df['WMA'] = wma30(close)
     df['WMA_Slope'] = df['WMA'].diff(1)
-    df['EMA9'] = df['Close'].ewm(span=9, adjust=False).mean()
+    # EMA9 via the specialised four-wide unrolled recurrence kernel
+    df['EMA9'] = ewma9(close)
     return df
 
-def detect_weinstein_signals(ticker, start, end, capital=100000):
+def detect_weinstein_signals(ticker, start, end, capital=100000, live_mode=False):
     try:
         df = yf.download(ticker, start=start, end=end, interval='1wk', auto_adjust=True, progress=False)
 
@@ -186,26 +225,54 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
         # For tracking breakdown candles
         breakdown_candle_low = None
 
-        for i in range(30, len(df)):
-            close = float(df["Close"].iloc[i])
-            wma = float(df["WMA"].iloc[i])
-            slope = float(df["WMA_Slope"].iloc[i])
-            ema9 = float(df["EMA9"].iloc[i])
-            low = float(df["Low"].iloc[i])  # Weekly low
-
-            if pd.isna(close) or pd.isna(wma) or pd.isna(slope) or pd.isna(ema9):
-                continue
-
-            # --- Buy condition ---
-            if not in_position and close > ema9 and close > wma and slope > 0:
-                entry_price = close
+        # These are historical events, so one digest per ticker replaces
+        # a queued message per signal; live_mode keeps per-bar delivery
+        alerts = []
+
+        def emit(text):
+            if live_mode:
+                send_telegram_message(text)
+            else:
+                alerts.append(text)
+
+        # Pull the columns out as contiguous arrays once; per-row .iloc
+        # lookups re-enter the pandas indexing machinery on every access
+        close_arr = df["Close"].to_numpy(dtype=np.float64)
+        wma_arr = df["WMA"].to_numpy(dtype=np.float64)
+        slope_arr = df["WMA_Slope"].to_numpy(dtype=np.float64)
+        ema9_arr = df["EMA9"].to_numpy(dtype=np.float64)
+        low_arr = df["Low"].to_numpy(dtype=np.float64)
+
+        # Phase-jump scan: the old loop visited every bar even though
+        # nothing can happen between state changes. The condition masks
+        # are precomputed once and argmax jumps straight to the next
+        # event bar, so Python-level iterations are O(state changes)
+        # instead of O(bars). Bars with a NaN indicator stay inert in
+        # every phase, exactly like the old per-bar isna guard.
+        n = len(close_arr)
+        valid = ~(np.isnan(close_arr) | np.isnan(wma_arr)
+                  | np.isnan(slope_arr) | np.isnan(ema9_arr))
+        buy_ok = (valid & (close_arr > ema9_arr) & (close_arr > wma_arr)
+                  & (slope_arr > 0))
+        below_ema = valid & (close_arr < ema9_arr)
+
+        i = 30
+        while i < n:
+            if not in_position:
+                # --- Buy condition: jump to the next qualifying bar ---
+                rest = buy_ok[i:]
+                j = int(np.argmax(rest))
+                if not rest[j]:
+                    break
+                i += j
+                entry_price = close_arr[i]
                 shares = cash // entry_price
                 if shares > 0:
                     cash -= shares * entry_price
                     in_position = True
                     entry_date = df.index[i]
                     # Send buy alert
-                    send_telegram_message(f"🟢 *BUY* {ticker} at {entry_price:.2f} on {entry_date.date()}")
+                    emit(f"🟢 *BUY* {ticker} at {entry_price:.2f} on {entry_date.date()}")
                     # Reset breakdown candle info
                     breakdown_candle_low = None
                     current_trade = {
@@ -215,29 +282,39 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
                         "Exit Price": None,
                         "Profit": None
                     }
-
-            # --- Track breakdown candle ---
-            if in_position and close < ema9:
-                if breakdown_candle_low is None:
-                    breakdown_candle_low = low
-
-            # --- Exit condition ---
-            if in_position and breakdown_candle_low is not None:
-                if close < breakdown_candle_low:
-                    exit_price = close
-                    cash += shares * exit_price
-                    trades += 1
-                    profit = (exit_price - entry_price) * shares
-                    if profit > 0:
-                        # Send sell alert
-                        send_telegram_message(f"🔴 *SELL* {ticker} at {exit_price:.2f} on {df.index[i].date()}")
-                        current_trade["Exit Date"] = df.index[i]
-                        current_trade["Exit Price"] = exit_price
-                        current_trade["Profit"] = profit
-                        trade_details.append(current_trade)
-                    in_position = False
-                    shares = 0
-                    breakdown_candle_low = None
+            elif breakdown_candle_low is None:
+                # --- Track breakdown candle: next close under the EMA ---
+                rest = below_ema[i:]
+                j = int(np.argmax(rest))
+                if not rest[j]:
+                    break
+                i += j
+                breakdown_candle_low = low_arr[i]
+            else:
+                # --- Exit condition: next close under the breakdown low ---
+                rest = valid[i:] & (close_arr[i:] < breakdown_candle_low)
+                j = int(np.argmax(rest))
+                if not rest[j]:
+                    break
+                i += j
+                exit_price = close_arr[i]
+                cash += shares * exit_price
+                trades += 1
+                profit = (exit_price - entry_price) * shares
+                if profit > 0:
+                    # Send sell alert
+                    emit(f"🔴 *SELL* {ticker} at {exit_price:.2f} on {df.index[i].date()}")
+                    current_trade["Exit Date"] = df.index[i]
+                    current_trade["Exit Price"] = exit_price
+                    current_trade["Profit"] = profit
+                    trade_details.append(current_trade)
+                in_position = False
+                shares = 0
+                breakdown_candle_low = None
+            # No two phase transitions can fire on the same bar: a buy
+            # bar has close > EMA9, arming needs close < EMA9, and the
+            # arming bar's close can never be under its own low
+            i += 1
 
         # Final sell if still holding position
         if in_position:
@@ -247,12 +324,15 @@ def detect_weinstein_signals(ticker, start, end, capital=100000):
             profit = (final_price - entry_price) * shares
             if profit > 0:
                 # Send final sell alert
-                send_telegram_message(f"🔴 *SELL* {ticker} at {final_price:.2f} on {df.index[-1].date()}")
+                emit(f"🔴 *SELL* {ticker} at {final_price:.2f} on {df.index[-1].date()}")
                 current_trade["Exit Date"] = df.index[-1]
                 current_trade["Exit Price"] = final_price
                 current_trade["Profit"] = profit
                 trade_details.append(current_trade)
 
+        if alerts:
+            send_telegram_message("\n".join(alerts))
+
         total_profit = cash - capital
         successful_trades = len([t for t in trade_details if t['Profit'] and t['Profit'] > 0])
         years = (df.index[-1] - df.index[0]).days / 365.25
@@ -285,11 +365,14 @@ start_date = start_date_dt.strftime("%Y-%m-%d")
 end_date = end_date_dt.strftime("%Y-%m-%d")
 initial_capital = 100000
 
-results = []
-for ticker in nifty50_tickers:
-    print(f"Processing {ticker}...")
-    result = detect_weinstein_signals(ticker, start=start_date, end=end_date, capital=initial_capital)
-    results.append(result)
+# Run tickers concurrently: the work is dominated by yfinance I/O, so a
+# small thread pool overlaps the downloads while keeping result order
+print(f"Processing {len(nifty50_tickers)} tickers...")
+with ThreadPoolExecutor(max_workers=8) as pool:
+    results = list(pool.map(
+        lambda ticker: detect_weinstein_signals(ticker, start=start_date, end=end_date, capital=initial_capital),
+        nifty50_tickers
+    ))
 
 # Convert results to DataFrame
 df_result = pd.DataFrame(results)
@@ -304,6 +387,9 @@ top_stock_details = next(r for r in results if r['Ticker'] == top_stock)
 trade_details_df = pd.DataFrame(top_stock_details['Trade Details'])
 trade_details_df.to_csv(f"{top_stock}_profitable_trade_details.csv", index=False)
 
+# Make sure every queued alert is actually delivered before exiting
+flush_telegram_messages()
+
 # Portfolio summary
 total_profit = df_result["Total Profit"].sum()
 final_value = initial_capital + total_profit